@@ -4,9 +4,14 @@
 #Importing the Python libraries to be used 
 import pandas as pd 
 import pathlib 
-import numpy as np 
+import sys 
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from sales_analysis import basket, cube, dates, geo, pricing, storage
+
+
+#set to True to also export the cleaned data as an Excel file, 'All Sales.xlsx', at the end
+EXPORT_EXCEL = False
 
 
 
@@ -14,7 +19,8 @@ import matplotlib.pyplot as plt
 #1. Loading, reading, and joining files
 
 #specifying the path for all the files in the folder 
-files_path = r'C:\Users\mmd19\OneDrive\Desktop\Exercise Files\Sales Data (by month)'
+#(the 'Sales Data (by month)' folder next to this script, unless another folder is given when running it)
+files_path = sys.argv[1] if len(sys.argv) > 1 else pathlib.Path(__file__).parent / 'Sales Data (by month)'
 #loading each csv file 
 files = pathlib.Path(files_path).rglob('*.csv')
 
@@ -43,19 +49,17 @@ print(df_all_months.head(10))
 print('')
 
 
-#3. Writing a New Excel File with the Dataframe (total sales data)
-#creating and storing all sales data from all months into a new file 'All Sales.xlsx'
-df_all_months.to_excel('All Sales.xlsx',            #specifying the file name
-                      sheet_name='Sales 2019',      #specifying the sheet name
-                      index=False)                  #removing unnecessary index coloumn
+#3. Storing the Dataframe (total sales data)
+#storing all sales data from all months in a columnar (Parquet) file, 'All Sales', in the store folder
+storage.save_frame(df_all_months, 'All Sales')
 
 
-#Loading and previewing data from the new file
-#creating a new dataframe, 'df', with the accumulated data in the file 'All Sales.xlsx'
-df = pd.read_excel('All Sales.xlsx')
+#Loading and previewing data from the store
+#creating a new dataframe, 'df', with the accumulated data in the stored 'All Sales' frame
+df = storage.load_frame('All Sales')
 
 #to preview the first 5 entries of the new dataframe 
-print('First 5 entries in \'All Sales.xlsx\' file:')
+print('First 5 entries in the stored \'All Sales\' data:')
 print(df.head())
 print('')
 
@@ -64,7 +68,7 @@ print('')
 #Part Two: Updating and Cleaning the Data 
 #Some of the data contain missing entries, inappropriate values (such as repeating coloumn headers), 
 # or NaN (Not a Number) values. Further, some of the data types don't match their values given that 
-# the data were converted from csv file format to Excel file format. It's time to take care of these 
+# the repeating headers forced every coloumn to be read as text. It's time to take care of these 
 # faulty entries and clean up the dataframe before moving forwards such that our analysis can proceed 
 # appripriately.
 
@@ -82,8 +86,8 @@ print('')
 
 
 #2. Converting Data to Appropriate Data Types
-#Given that we switched from csv file format to Excel format, we need to make sure that all the numerical 
-# data in the file are indeed of the numeric type (rather than being considered as text data).
+#Given that the repeating headers in the csv files were read as text, we need to make sure that all the 
+# numerical data in the file are indeed of the numeric type (rather than being considered as text data).
 
 #checking the data types of the coloumns with numeric values before converting
 print('Data type of coloumns before converting:')
@@ -109,9 +113,13 @@ print('')
 
 
 #2.2. Coverting the Datetime Entries to Datetime-type Data
-#converting the data in the 'Order Date' coloumn to datetime-type data 
+#converting the data in the 'Order Date' coloumn to datetime-type data (parsed only once; 
+# the months and hours needed later are derived from it directly rather than from text)
 df['Order Date'] = pd.to_datetime(df['Order Date'], 
-            format='%m/%d/%y %H:%M', errors='coerce').dt.strftime('%d/%m/%y %H:%M')       #to change the format of the datetime (to day/month/year)
+            format='%m/%d/%y %H:%M', errors='coerce')
+
+#dropping the entries whose date couldn't be converted (the months and hours can't be derived from them)
+df = df.dropna(subset=['Order Date'])
 
 
 #previewing the first entries off the 'Order Date' coloumn
@@ -120,18 +128,26 @@ print(df['Order Date'].head())
 print('')
 
 
-#3. Updating the Excel File
-#overwriting the Excel file, 'All Sales.xlsx', with the updated/cleaned up dataframe 
-df.to_excel('All Sales.xlsx', sheet_name='Sales 2019', index=False)
+#3. Updating the Stored Data
+#storing the updated/cleaned up dataframe as 'Clean Sales' (the numeric types are kept as they are)
+storage.save_frame(df, 'Clean Sales')
 
 #now we can load and use a clean dataframe 
-df = pd.read_excel('All Sales.xlsx')
+df = storage.load_frame('Clean Sales')
 
 
 #Part Three: Exploring the Data 
 #This part will consist of different real-world business questions and ways to 
 # answer these questions using Python's data analysis libraries and tools.
 
+#Most of the questions below add up quantities and sales by month, city, product, or hour of the day. 
+# Rather than grouping all the orders again for every question, we can summarize them once into a small 
+# table (a 'cube') holding the quantity, sales amount, and number of order lines for each combination of 
+# month, hour, city, and product, and then simply add up the parts of it that each question needs.
+sales_cube = cube.build_cube(df)
+print('Number of rows in the summary cube:', len(sales_cube))
+print('')
+
 #Question 1: What was the best month for sales? How much was earned that month?
 
 #To answer this question, first, we need to extract only the months from the 'Order Date' coloumn 
@@ -142,7 +158,7 @@ df = pd.read_excel('All Sales.xlsx')
 # how sales changed from one month to the next.
 
 #First, adding a months coloumn
-Months_col = pd.to_datetime(df['Order Date']).dt.month_name().str[:3]         #creating a months coloumn (by month abbreviation)
+Months_col = dates.month_column(df['Order Date'])         #creating a months coloumn (by month number, 1-12)
 df.insert(loc=5, column='Months', value=Months_col)              #inserting the months coloumn into the dataframe 
 
 #Second, adding a sales coloumn 
@@ -155,17 +171,11 @@ print('')
 
 
 #Third, grouping the data by month and calculating the total sales (and quantities) amount for each month
-sales_per_month = df.groupby(['Months']).sum()[['Quantity Ordered', 'Sales']]
-
-#sorting the data in alphabetical order by month name
-#specifying the sorting order 
-sort_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+#(the months are numbers, so the results are already sorted from January to December)
+sales_per_month = cube.rollup(sales_cube, 'Month', ['Quantity Ordered', 'Sales']).rename_axis('Months')
 
-#sorting the data
-sales_per_month = sales_per_month.reindex(sort_order)
-
-#to present the sales in USD and display them in a reader-friendly manner
-sales_per_month_USD = sales_per_month.copy()
+#to present the sales in USD and display them in a reader-friendly manner (by month abbreviation)
+sales_per_month_USD = dates.label_months(sales_per_month)
 sales_per_month_USD['Sales'] = sales_per_month_USD['Sales'].apply(lambda sale: '${:,.2f}'.format(sale))
 
 #displaying the results 
@@ -179,7 +189,7 @@ sales_per_month_sorted = sales_per_month.sort_values(by='Sales', ascending=False
 best_month = sales_per_month_sorted.index[0]
 
 #getting month full name 
-best_month = pd.to_datetime(best_month, format='%b').month_name()
+best_month = dates.MONTH_NAMES[best_month]
 
 #reporting the best month for sales 
 print('The best month for sales was:', best_month)
@@ -193,7 +203,7 @@ print('')
 
 
 #Finally, we can also visualize the amount of sales per month using a bar chart
-months = sales_per_month.index.values 
+months = dates.label_months(sales_per_month).index.values 
 sales = sales_per_month['Sales']
 
 #specifying the figure size 
@@ -226,20 +236,16 @@ plt.show()
 # Thereafter, we can group the data by city and calculate the total sum of sales for 
 # each city separately.
 
-#Defining a function for extracting city (and state) from 'Purchase Address' coloumn
-def get_city_state(address):
-        address = address.split(', ') 
-        city = address[1]
-        state = address[2][0:2]
-        return "{} ({})".format(city, state)
+#Extracting the city (and state) from the 'Purchase Address' coloumn, as "City (ST)"
+#(each distinct city/state/ZIP is parsed once and stored as a categorical coloumn)
+city_col = geo.city_column(df['Purchase Address'])
 
 #Adding a city coloumn
-city_col = df['Purchase Address'].apply(lambda add: get_city_state(add))
 df.insert(loc=8, column='City', value=city_col)
 
 
 #Grouping the data by city and calculating the total sales amount for each city
-sales_per_city = df.groupby(['City']).sum()['Sales']
+sales_per_city = cube.rollup(sales_cube, 'City', ['Sales'])['Sales']
 
 #formating sales to present them in USD
 sales_per_city_USD = sales_per_city.apply(lambda sale: '${:,.2f}'.format(sale)).to_frame(name='Total Sales Amount')
@@ -298,7 +304,7 @@ plt.show()
 # determine which one sold the most amount of quantities
 
 #Grouping data by product names and calculating the total quantity ordered for a given product
-products_sold = df.groupby(['Product']).sum()['Quantity Ordered']
+products_sold = cube.rollup(sales_cube, 'Product', ['Quantity Ordered'])['Quantity Ordered']
 
 #sorting the data in descending order to determine the product that sold the most
 products_sold = products_sold.sort_values(ascending=False)
@@ -325,13 +331,15 @@ print('')
 # the second representing the total quantity sold for each product.
 
 #Creating the first group for quantity sold per product
-products_quantity = df.groupby(['Product']).sum()['Quantity Ordered']
+products_quantity = cube.rollup(sales_cube, 'Product', ['Quantity Ordered'])['Quantity Ordered']
 
 #extracting the product names 
 products = products_quantity.index.values 
 
 #creating the second group for price per product
-products_prices = df.groupby(['Product'])['Price Each'].apply(lambda price: float(np.unique(price)))
+#(the average price paid per unit, which also works for products sold at more than one price)
+product_stats = pricing.product_stats(df)
+products_prices = product_stats['Average Price']
 
 
 #Now, creating a subplot to compare product prices to sold quantities 
@@ -382,6 +390,14 @@ plt.grid()
 plt.show()
 
 
+#Putting numbers on the relationship: the correlation between the price and quantity sold of the products,
+# and the elasticity (the % change in quantity sold for a 1% higher price, from a log-log regression)
+relationship = pricing.price_quantity_relationship(products_quantity, products_prices)
+print('Correlation between price and quantity sold:', round(relationship['correlation'], 2))
+print('Price elasticity across products:', round(relationship['elasticity'], 2))
+print('')
+
+
 #What can we conclude from the chart?
 print('''As the line chart illustrates, the lower the price of a product, the higher the quantity sold
  of that product, as in the case of batteries products for instance. Meanwhile, the higher the product 
@@ -395,29 +411,27 @@ print('')
 
 
 #Question 5: Which products are most often sold together?
-#For starters, we can filter data based on whether there are duplicates in the 'Order ID'
-# coloumn, indicating that the same person made multiple product purchases, and then join 
-# the multiple products sold together and count the instances of particular products being 
-# sold together in order to extract those that most often ordered together.
-
-#First, filtering data for Order ID duplicates 
-order_filter = df['Order ID'].duplicated(keep=False) 
-
-#extracting and storing orders with more than one purchase into a dataframe
-df_multiple_orders = df[order_filter][['Order ID', 'Product']]         #storing only the relevant coloumns: 'Order ID' and 'Product'
-
-#grouping data by Order ID and joining multiple products purchased by same person into one coloumn (/Series object)
-orders_per_person = df_multiple_orders.groupby(['Order ID'])['Product'].transform(lambda product: ", ".join(product))
-df_orders_per_person = orders_per_person.to_frame(name='Products Sold Together').reset_index(drop=True)        #again changing to table form
-
-#previewing the first 5 entries of our joined orders coloumn 'orders_per_person'
-print('Products purchased per order (first 5 entries):')
-print(df_orders_per_person.head())
+#For starters, we can look at orders with the same 'Order ID', indicating that the same person made 
+# multiple product purchases, and count the instances of particular products being sold together in 
+# order to extract those that are most often ordered together.
+
+#First, encoding the orders as a (sparse) table with one row per order and one coloumn per product, 
+# marking which products were bought in each order
+baskets = basket.Baskets.from_orders(df['Order ID'], df['Product'])
+
+#counting the number of orders in which each pair of products was sold together 
+#(along with the share of all orders, 'Support', and how much more likely the products are to be bought 
+# together than by chance, 'Lift')
+products_pairs = baskets.pairs()
+
+#previewing the first 5 pairs
+print('Products sold together (first 5 pairs):')
+print(products_pairs[['Product A', 'Product B', 'Count', 'Support', 'Lift']].head())
 print('')
 
 
-#finally, to get the frequency of orders sold together 
-orders_frequency = orders_per_person.value_counts()       #sorted in descending order
+#finally, to get the frequency of products sold together 
+orders_frequency = products_pairs['Count'].set_axis(products_pairs['Product A'] + ', ' + products_pairs['Product B'])       #sorted in descending order
 #to present the data in table form
 df_orders_frequency = orders_frequency.to_frame(name='Frequency of products sold together')
 
@@ -433,6 +447,12 @@ print('The two products sold together the most often are: {}'.format(' and '.joi
 print('')
 
 
+#we can also look for three products sold together 
+products_triples = baskets.itemsets(3)
+print('The three products sold together the most often are: {}'.format(', '.join(products_triples['Items'].iloc[0])))
+print('')
+
+
 
 #Question 6: Which time of the day should we display advertisements to maximize the likelihood of customer's purchasing products?
 #One way to answer this question is to extract the time of the day from the 'Order Date' coloumn, and then 
@@ -440,7 +460,7 @@ print('')
 # times are associated with the most product purchases.
 
 #First, extracting time of purchase and storing it in a new coloumn, 'Time of Purchase' 
-Time_col = pd.to_datetime(df['Order Date'], format='%d/%m/%y %H:%M').dt.strftime('%I %p')       #creating a time coloumn (by 'hour' of purchase)
+Time_col = dates.hour_column(df['Order Date'])       #creating a time coloumn (by 'hour' of purchase, 0-23)
 
 #adding a 'Time of Purchase' coloumn to the dataframe 
 df.insert(loc=6, column='Time of Purchase', value=Time_col)              #inserting the time coloumn into the dataframe 
@@ -448,15 +468,11 @@ df.insert(loc=6, column='Time of Purchase', value=Time_col)              #insert
 
 #second, grouping the data by time of purchase and calculating the total sum of quantities 
 #sold for each hour of the day 
-purchases_per_hour = df.groupby(['Time of Purchase']).sum()['Quantity Ordered']
+#(the hours are numbers, so the results are already sorted from 12 AM to 11 PM)
+purchases_per_hour = cube.rollup(sales_cube, 'Hour', ['Quantity Ordered'])['Quantity Ordered'].rename_axis('Time of Purchase')
 
-#rearranging the order
-time_sort_order = ['12 AM', '01 AM', '02 AM', '03 AM', '04 AM', '05 AM', '06 AM', '07 AM', '08 AM', '09 AM', '10 AM', '11 AM', 
-                   '12 PM', '01 PM', '02 PM', '03 PM', '04 PM', '05 PM', '06 PM', '07 PM', '08 PM', '09 PM', '10 PM', '11 PM']
-purchases_per_hour = purchases_per_hour.reindex(time_sort_order)
-
-#to present the data in table form
-df_purchases_per_hour = purchases_per_hour.to_frame(name='Total Quantity Sold')
+#to present the data in table form (with hours displayed as '12 AM', '01 AM', etc.)
+df_purchases_per_hour = dates.label_hours(purchases_per_hour).to_frame(name='Total Quantity Sold')
 
 #reporting the amounts of purchases made for each time of the day 
 print('The following table displays the total sum of quantities ordered for each hour of the day:')
@@ -469,7 +485,7 @@ print('')
 purchases_per_hour_sorted = purchases_per_hour.sort_values(ascending=False)
 
 #extracting the best time for sales 
-best_hour = purchases_per_hour_sorted.index[0]
+best_hour = dates.HOUR_LABELS[purchases_per_hour_sorted.index[0]]
 
 #reporting the result
 print('The best time of day for displaying advertisements is:', best_hour)
@@ -478,7 +494,7 @@ print('')
 
 #Finally, we can plot the data using a bar chart in order to get a better view
 # of how many purchases are made per hour
-time_of_purchase = purchases_per_hour.index.values
+time_of_purchase = dates.label_hours(purchases_per_hour).index.values
 
 #setting the figure size 
 plt.figure(figsize=(12,7)) 
@@ -510,5 +526,13 @@ plt.show()
 print("""As illustrated in the bar chart, it appears that the best time to display advertisements
 in order to increase product purchases is in the evening (between 6 PM to 8 PM) and in the
 afternoon (between 11 AM to 1 PM). These are the time ranges associated with most product purchases.""")
+print('')
+
+
+
+#Exporting the Results
+#optionally exporting the clean data to an Excel file, 'All Sales.xlsx', for sharing
+if EXPORT_EXCEL:
+    storage.export_excel(df, 'All Sales.xlsx', sheet_name='Sales 2019')
 
 #END
\ No newline at end of file
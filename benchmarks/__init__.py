@@ -0,0 +1 @@
+"""Benchmarks for the sales analysis pipeline (run with ``python -m benchmarks.run``)."""
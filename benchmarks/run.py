@@ -0,0 +1,161 @@
+"""Time and memory-profile every stage of the sales analysis pipeline.
+
+Usage::
+
+    python -m benchmarks.run --rows 100000 1000000 --output benchmark_report.json
+
+For every size, synthetic data is generated (see :mod:`benchmarks.synthetic`)
+and ingested into a store file by file, exactly as the command line does
+(see :mod:`sales_analysis.ingest`), then the six questions are answered from
+the store. The steps of the ingest are reported as stages summed over the
+files: load (reading a file as text), clean (validating and typing it),
+derive (its aggregate cube and daily sales), export (storing the part) and
+merge (the cube and daily sales of the whole store). The wall time, rows out
+(for the questions, the rows of their main table), and the peak resident
+memory during every stage (sampled in a background thread) are written to a
+JSON report, so results can be compared between versions. Since only a few
+files are in memory at a time, the peak memory depends on the size of the
+monthly files rather than on the whole dataset. ``--tracemalloc`` also
+records the peak memory allocated through Python, at a large cost in time.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_dataset
+from sales_analysis import storage
+from sales_analysis.ingest import ingest, load_ingested, load_manifest
+from sales_analysis.instrument import Instrument, RssSampler
+from sales_analysis.questions import QUESTIONS, SalesData
+
+
+#the steps of the ingest (see sales_analysis.instrument) reported as stages
+#(none of them runs inside another, so their times add up)
+INGEST_STAGES = {'read.read_raw': 'load', 'read.validate': 'clean', 'cube.build': 'derive',
+                 'timeseries.daily_sales': 'derive', 'ingest.store_part': 'export', 'ingest.merge': 'merge'}
+
+
+def measure(name, func, trace_memory=False):
+    """Run ``func()`` and return its result and a dict of measurements for stage ``name``."""
+    if trace_memory:
+        tracemalloc.start()
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result, {'stage': name, 'seconds': round(seconds, 6), 'rows_out': _rows(result),
+                    'rss_start_mb': round(rss.start / 1e6, 3),
+                    'rss_peak_mb': round(rss.peak / 1e6, 3),
+                    'rss_end_mb': round(rss.end / 1e6, 3),
+                    'traced_peak_mb': None if traced_peak is None else round(traced_peak / 1e6, 3)}
+
+
+def _rows(result):
+    #the rows of a table, or of the main table of a question's results (its first one)
+    if isinstance(result, dict):
+        result = next((value for value in result.values() if isinstance(value, (pd.Series, pd.DataFrame))), None)
+    return len(result) if isinstance(result, (pd.Series, pd.DataFrame)) else None
+
+
+def run_pipeline(data_dir, store_dir, trace_memory=False, excel=False):
+    """Ingest the csv files in ``data_dir``, answer the questions and return the measurements.
+
+    Returns the stages and the totals of every instrumented step of the run.
+    """
+    stages = []
+
+    def stage(name, func):
+        result, stats = measure(name, func, trace_memory)
+        stages.append(stats)
+        return result
+
+    #ingesting in this process, so that every step of every file is recorded
+    with Instrument() as instrument:
+        stage('ingest', lambda: ingest(data_dir, store_dir, workers=1))
+        stages[-1]['rows_out'] = sum(entry['rows'] for entry in load_manifest(store_dir)['files'].values())
+        steps = instrument.totals()
+        for step, name in INGEST_STAGES.items():
+            if step in steps:
+                stages.append({'stage': name, 'step': step, 'calls': steps[step]['calls'],
+                               'seconds': steps[step]['seconds'], 'rows_out': steps[step]['rows_out'],
+                               'rss_peak_mb': round(steps[step]['rss_peak_bytes'] / 1e6, 3)})
+
+        data = SalesData(store_dir)
+        for number, question in QUESTIONS.items():
+            stage('q{}_{}'.format(number, question.__name__), lambda: question(data))
+        if excel:
+            stage('export_excel', lambda: storage.export_excel(load_ingested(store_dir),
+                                                               pathlib.Path(store_dir) / 'All Sales.xlsx'))
+    return stages, instrument.totals()
+
+
+def environment():
+    """Return the versions and machine details recorded with every report."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=pathlib.Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'pandas': pd.__version__,
+            'numpy': np.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000],
+                        help='dataset sizes to benchmark (number of order lines)')
+    parser.add_argument('--years', type=int, default=1, help='number of years the synthetic data spans')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help='benchmark these csv files instead of synthetic data')
+    parser.add_argument('--work-dir', help='where to write the synthetic data and store (default: a temporary folder)')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='also trace Python allocations (much slower, so timings are not comparable)')
+    parser.add_argument('--excel', action='store_true', help='also time the Excel export (slow on large data)')
+    parser.add_argument('--output', default='benchmark_report.json', help='path of the JSON report')
+    args = parser.parse_args(argv)
+
+    report = {'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+              'environment': environment(), 'runs': []}
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as work_dir:
+        sizes = [None] if args.data_dir else args.rows
+        for rows in sizes:
+            run_dir = pathlib.Path(work_dir) / 'rows-{}'.format(rows)
+            if args.data_dir:
+                data_dir = args.data_dir
+                generate = None
+            else:
+                data_dir = run_dir / 'data'
+                _, generate = measure('generate', lambda: write_dataset(
+                    data_dir, rows, years=range(2019, 2019 + args.years), seed=args.seed), trace_memory=False)
+            stages, steps = run_pipeline(data_dir, run_dir / 'store', args.tracemalloc, args.excel)
+            report['runs'].append({'rows': rows, 'data_dir': str(data_dir) if args.data_dir else None,
+                                   'tracemalloc': args.tracemalloc, 'generate': generate, 'stages': stages,
+                                   'steps': steps})
+            for stats in stages:
+                print('{:>12} {:<30} {:>10.3f}s {:>10.1f} MB peak RSS'.format(
+                    rows or '-', ' '.join([stats['stage']] + ([stats['step']] if 'step' in stats else [])),
+                    stats['seconds'], stats['rss_peak_mb']))
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print('Report written to', args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Synthetic order data in the same format as the monthly sales files.
+
+The generated files follow the ``Order ID,Product,Quantity Ordered,Price
+Each,Order Date,Purchase Address`` layout of ``Sales Data (by month)``,
+including its noise (repeated header rows and empty ",,,,," rows), with
+product, city and hour-of-day frequencies roughly matching the 2019 data.
+Files are written in chunks, so 10^8 rows can be generated in bounded memory.
+"""
+
+import calendar
+import functools
+import pathlib
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+COLUMNS = ['Order ID', 'Product', 'Quantity Ordered', 'Price Each', 'Order Date', 'Purchase Address']
+
+#products with their price and (relative) number of order lines in 2019
+PRODUCTS = {
+    'USB-C Charging Cable': ('11.95', 21903),
+    'Lightning Charging Cable': ('14.95', 21658),
+    'AAA Batteries (4-pack)': ('2.99', 20641),
+    'AA Batteries (4-pack)': ('3.84', 20577),
+    'Wired Headphones': ('11.99', 18882),
+    'Apple Airpods Headphones': ('150', 15549),
+    'Bose SoundSport Headphones': ('99.99', 13325),
+    '27in FHD Monitor': ('149.99', 7507),
+    'iPhone': ('700', 6842),
+    '27in 4K Gaming Monitor': ('389.99', 6230),
+    '34in Ultrawide Monitor': ('379.99', 6181),
+    'Google Phone': ('600', 5525),
+    'Flatscreen TV': ('300', 4800),
+    'Macbook Pro Laptop': ('1700', 4724),
+    'ThinkPad Laptop': ('999.99', 4128),
+    '20in Monitor': ('109.99', 4101),
+    'Vareebadd Phone': ('400', 2065),
+    'LG Washing Machine': ('600', 666),
+    'LG Dryer': ('600', 646),
+}
+
+#cities (with state and ZIP) and their number of order lines in 2019
+CITIES = {
+    'San Francisco, CA 94016': 44732,
+    'Los Angeles, CA 90001': 29605,
+    'New York City, NY 10001': 24876,
+    'Boston, MA 02215': 19934,
+    'Atlanta, GA 30301': 14881,
+    'Dallas, TX 75001': 14820,
+    'Seattle, WA 98101': 14732,
+    'Portland, OR 97035': 10010,
+    'Austin, TX 73301': 9905,
+    'Portland, ME 04101': 2455,
+}
+
+STREETS = ['Chestnut St', '7th St', 'Main St', '12th St', '2nd St', '6th St', 'Lake St', 'Wilson St',
+           'Center St', 'Madison St', 'Jackson St', 'Hill St', 'South St', 'Lincoln St', 'Hickory St',
+           'Spruce St', 'Church St', 'Sunset St', 'Highland St', 'North St', 'Walnut St', 'Adams St',
+           '11th St', 'Dogwood St', '10th St', 'Maple St', '13th St', 'Willow St', '5th St', 'Washington St']
+
+#quantities ordered per order line in 2019 (1 to 9 units)
+QUANTITY_WEIGHTS = [168552, 13324, 2920, 806, 236, 80, 24, 5, 3]
+
+#quantities ordered per hour of the day (0-23) in 2019
+HOUR_WEIGHTS = [4428, 2619, 1398, 928, 937, 1493, 2810, 4556, 7002, 9816, 12308, 14005,
+                14202, 13685, 12362, 11391, 11662, 12229, 13802, 14470, 13768, 12244, 9899, 7065]
+
+#share of order lines that belong to the same order as the line before
+MULTI_ITEM_RATE = 0.04
+
+
+def _probabilities(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+
+@functools.lru_cache(maxsize=None)
+def _minute_labels(year, month):
+    #the 'Order Date' text of every minute of the month, built from its (few) parts
+    days = calendar.monthrange(year, month)[1]
+    times = ['{:02d}:{:02d}'.format(hour, minute) for hour in range(24) for minute in range(60)]
+    return pa.array(['{:02d}/{:02d}/{:02d} {}'.format(month, day, year % 100, time)
+                     for day in range(1, days + 1) for time in times])
+
+
+def generate_chunk(rng, year, month, n_rows, first_order_id):
+    """Return ``n_rows`` order lines of one month as a table of strings.
+
+    Order ids start at ``first_order_id``. Returns a pyarrow table with the
+    csv columns and the next unused order id.
+    """
+    #consecutive lines of the same order share the order id, date and address
+    new_order = rng.random(n_rows) >= MULTI_ITEM_RATE
+    new_order[0] = True
+    order_ids = first_order_id + np.cumsum(new_order) - 1
+    order_start = np.maximum.accumulate(np.where(new_order, np.arange(n_rows), 0))
+
+    product = rng.choice(len(PRODUCTS), n_rows, p=_probabilities([count for _, count in PRODUCTS.values()]))
+    quantity = rng.choice(np.arange(1, 10), n_rows, p=_probabilities(QUANTITY_WEIGHTS))
+
+    #order dates, by minute of the month (formatted once per distinct minute)
+    days = calendar.monthrange(year, month)[1]
+    minute = (rng.integers(0, days, n_rows) * 1440
+              + rng.choice(24, n_rows, p=_probabilities(HOUR_WEIGHTS)) * 60
+              + rng.integers(0, 60, n_rows))[order_start]
+
+    #addresses: a house number and street, then the city, state and ZIP
+    city = rng.choice(len(CITIES), n_rows, p=_probabilities(list(CITIES.values())))[order_start]
+    house = rng.integers(1, 1000, n_rows)[order_start]
+    street = rng.integers(0, len(STREETS), n_rows)[order_start]
+    address = pc.binary_join_element_wise(
+        pc.binary_join_element_wise(pa.array(house).cast(pa.string()), pa.array(STREETS).take(street), ' '),
+        pa.array(list(CITIES)).take(city), ', ')
+
+    table = pa.table({
+        'Order ID': pa.array(order_ids).cast(pa.string()),
+        'Product': pa.array(list(PRODUCTS)).take(product),
+        'Quantity Ordered': pa.array(quantity).cast(pa.string()),
+        'Price Each': pa.array([price for price, _ in PRODUCTS.values()]).take(product),
+        'Order Date': _minute_labels(year, month).take(minute),
+        'Purchase Address': address,
+    })
+    return table, int(order_ids[-1]) + 1
+
+
+def csv_lines(rng, table, noise=0.004):
+    """Return the rows of ``table`` as csv lines, with noise as in the real files.
+
+    About ``noise`` of the lines are repeated header rows and as many are
+    empty ",,,,," rows, inserted at random positions. Only the addresses
+    (which contain commas) are quoted. Every line ends with a newline.
+    """
+    quoted_address = pc.binary_join_element_wise('"', table['Purchase Address'], '"', '')
+    columns = [table[col] for col in COLUMNS[:-1]] + [quoted_address]
+    lines = pc.binary_join_element_wise(*columns, ',').combine_chunks()
+
+    #inserting repeated header rows and empty rows at random positions
+    n_headers, n_empty = rng.binomial(len(lines), noise, size=2)
+    noise_lines = pa.array([','.join(COLUMNS)] * n_headers + [',' * (len(COLUMNS) - 1)] * n_empty, pa.string())
+    positions = np.concatenate([np.arange(len(lines)), rng.integers(0, len(lines), len(noise_lines))])
+    lines = pa.concat_arrays([lines, noise_lines]).take(np.argsort(positions, kind='stable'))
+    return pc.binary_join_element_wise(lines, '\n', '')
+
+
+def write_lines(file, lines):
+    """Write the string array ``lines`` to the binary ``file`` as one block of bytes."""
+    #the characters of a string array are stored back to back, so they can be written directly
+    offsets = np.frombuffer(lines.buffers()[1], dtype=np.int32)[lines.offset:lines.offset + len(lines) + 1]
+    file.write(memoryview(lines.buffers()[2])[offsets[0]:offsets[-1]])
+
+
+def write_dataset(out_dir, rows, years=(2019,), seed=0, chunk_rows=1_000_000, noise=0.004):
+    """Write about ``rows`` order lines as monthly csv files in ``out_dir``.
+
+    The rows are spread evenly over every month of ``years``, in files named
+    like the real ones (``Sales_<Month>_<Year>.csv``). Returns the file paths.
+    """
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    months = [(year, month) for year in years for month in range(1, 13)]
+    per_month = np.full(len(months), rows // len(months))
+    per_month[:rows % len(months)] += 1
+
+    paths = []
+    next_order_id = 100000
+    for (year, month), month_rows in zip(months, per_month):
+        path = out_dir / 'Sales_{}_{}.csv'.format(calendar.month_name[month], year)
+        with open(path, 'wb') as file:
+            file.write((','.join(COLUMNS) + '\n').encode())
+            for start in range(0, month_rows, chunk_rows):
+                n_rows = min(chunk_rows, month_rows - start)
+                chunk, next_order_id = generate_chunk(rng, year, month, n_rows, next_order_id)
+                write_lines(file, csv_lines(rng, chunk, noise))
+        paths.append(path)
+    return paths
@@ -0,0 +1,24 @@
+#SALES ANALYSIS (package)
+"""Reusable building blocks for the sales analysis.
+
+The ``Sales Analysis.py`` script walks through the analysis step by step; the
+modules in this package hold the parts of it that are worth reusing, such as
+storing the merged and cleaned sales data, and one function per question (see
+:mod:`sales_analysis.questions`). ``python -m sales_analysis DATA_DIR -q 1 6``
+answers only the questions asked for (see :mod:`sales_analysis.cli`).
+"""
+
+from sales_analysis.storage import save_frame, load_frame, export_excel
+from sales_analysis.ingest import ingest, load_ingested, load_quarantine
+from sales_analysis.loader import load_sales
+from sales_analysis.streaming import stream_aggregates
+from sales_analysis.dates import month_column, hour_column, label_months, label_hours
+from sales_analysis.basket import Baskets, products_sold_together
+from sales_analysis.cube import build_cube, load_cube, rollup
+from sales_analysis.schema import read_sales
+from sales_analysis.questions import QUESTIONS, SalesData, run_questions
+from sales_analysis.cache import ResultCache
+from sales_analysis.timeseries import SalesTimeSeries, daily_sales
+from sales_analysis.instrument import Instrument
+from sales_analysis.pricing import product_stats
+from sales_analysis.mapped import MappedSales, open_mapped
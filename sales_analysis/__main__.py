@@ -0,0 +1,6 @@
+import sys
+
+from sales_analysis.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,137 @@
+"""Market-basket analysis: which products are sold together (Question 5).
+
+Orders and products are encoded as integer ids and turned into a sparse
+order x product incidence matrix. Pair counts then come from a single sparse
+matrix product, and larger itemsets are counted by extending the frequent
+smaller ones, so millions of orders are handled in seconds.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class Baskets:
+    """The products of every order, as a sparse order x product matrix.
+
+    Build it with :meth:`from_orders`; ``matrix[i, j]`` is 1 if order ``i``
+    contains product ``j`` (however many units or rows), and ``products``
+    holds the product name of every column.
+    """
+
+    def __init__(self, matrix, products):
+        self.matrix = matrix
+        self.products = pd.Index(np.asarray(products))
+
+    @classmethod
+    def from_orders(cls, order_ids, products):
+        """Build the baskets from the aligned Series ``order_ids`` and ``products``."""
+        order_codes, _ = pd.factorize(order_ids)
+        product_codes, product_names = pd.factorize(products, sort=True)
+        keep = (order_codes >= 0) & (product_codes >= 0)
+        order_codes, product_codes = order_codes[keep], product_codes[keep]
+
+        shape = (order_codes.max() + 1 if len(order_codes) else 0, len(product_names))
+        data = np.ones(len(order_codes), dtype=np.int32)
+        matrix = sparse.csr_matrix((data, (order_codes, product_codes)), shape=shape)
+        #repeated rows of the same product in an order count only once
+        matrix.data[:] = 1
+        return cls(matrix, product_names)
+
+    @property
+    def n_orders(self):
+        return self.matrix.shape[0]
+
+    def item_counts(self):
+        """Return the number of orders containing each product."""
+        counts = np.asarray(self.matrix.sum(axis=0)).ravel()
+        return pd.Series(counts, index=self.products, name='Count')
+
+    def pairs(self, min_count=1):
+        """Return every pair of products bought together in at least ``min_count`` orders.
+
+        The result has one row per pair ('Product A' < 'Product B') with its
+        'Count', 'Support' (share of all orders), the confidences of the rules
+        A -> B and B -> A, and the 'Lift', sorted by count (descending).
+        """
+        co_counts = sparse.triu(self.matrix.T @ self.matrix, k=1).tocoo()
+        keep = co_counts.data >= min_count
+        a, b, counts = co_counts.row[keep], co_counts.col[keep], co_counts.data[keep]
+
+        item_counts = self.item_counts().to_numpy()
+        n_orders = self.n_orders
+        pairs = pd.DataFrame({
+            'Product A': self.products[a],
+            'Product B': self.products[b],
+            'Count': counts.astype(np.int64),
+            'Support': counts / n_orders,
+            'Confidence A->B': counts / item_counts[a],
+            'Confidence B->A': counts / item_counts[b],
+            'Lift': counts * n_orders / (item_counts[a] * item_counts[b].astype(np.float64)),
+        })
+        return pairs.sort_values(['Count', 'Product A', 'Product B'],
+                                 ascending=[False, True, True], ignore_index=True)
+
+    def itemsets(self, size, min_count=1):
+        """Return the itemsets of ``size`` products bought together in at least ``min_count`` orders.
+
+        The result has the columns 'Items' (a tuple of product names),
+        'Count' and 'Support', sorted by count (descending). Each itemset is
+        found by extending a frequent itemset one product smaller, counting
+        all its extensions at once over the orders that contain it; only
+        frequent itemsets are extended, so a higher ``min_count`` prunes the
+        search.
+        """
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        csc = self.matrix.tocsc()
+        indptr, indices = self.matrix.indptr, self.matrix.indices
+        n_products = len(self.products)
+
+        #the frequent itemsets found so far, with the (sorted) rows of the orders that contain them
+        frequent = {(item,): csc.indices[csc.indptr[item]:csc.indptr[item + 1]] for item in range(n_products)
+                    if csc.indptr[item + 1] - csc.indptr[item] >= min_count}
+        counts = {itemset: len(rows) for itemset, rows in frequent.items()}
+
+        for _ in range(size - 1):
+            extended, counts = {}, {}
+            for itemset, rows in frequent.items():
+                #gathering the products of those orders, and the order each one belongs to
+                starts = indptr[rows]
+                lengths = indptr[rows + 1] - starts
+                positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+                items, owners = indices[positions], np.repeat(rows, lengths)
+
+                #keeping only the frequent extensions by a larger product (so each itemset is found once)
+                ext_counts = np.bincount(items, minlength=n_products)
+                keep = (items > itemset[-1]) & (ext_counts[items] >= min_count)
+                items, owners = items[keep], owners[keep]
+
+                #grouping the orders by the product that extends the itemset
+                order = np.argsort(items, kind='stable')
+                items, owners = items[order], owners[order]
+                new_items, group_starts = np.unique(items, return_index=True)
+                for item, item_rows in zip(new_items, np.split(owners, group_starts[1:])):
+                    extended[itemset + (item,)] = item_rows
+                    counts[itemset + (item,)] = len(item_rows)
+            frequent = extended
+
+        result = pd.DataFrame({
+            'Items': [tuple(self.products[list(itemset)]) for itemset in counts],
+            'Count': np.fromiter(counts.values(), dtype=np.int64, count=len(counts)),
+        })
+        result['Support'] = result['Count'] / self.n_orders
+        return result.sort_values('Count', ascending=False, ignore_index=True)
+
+
+def products_sold_together(df, size=2, min_count=1):
+    """Return the products most often sold together in the sales data ``df``.
+
+    A convenience wrapper around :class:`Baskets` using the 'Order ID' and
+    'Product' columns: pairs (with support, confidence and lift) for
+    ``size=2``, itemsets of ``size`` products otherwise.
+    """
+    baskets = Baskets.from_orders(df['Order ID'], df['Product'])
+    if size == 2:
+        return baskets.pairs(min_count=min_count)
+    return baskets.itemsets(size, min_count=min_count)
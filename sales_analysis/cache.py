@@ -0,0 +1,119 @@
+"""Disk-backed, size-bounded cache of question results.
+
+Results are keyed by a fingerprint of the ingested dataset (a hash of the
+content hashes in the ingest manifest), the question and its parameters, so a
+repeated question on unchanged data is answered without loading anything from
+the store. When the manifest changes, the fingerprint changes with it and the
+results of the old data are dropped. The cache is kept under a size limit by
+evicting the least recently used results.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from sales_analysis import storage
+
+
+RESULTS_DIR = 'results'
+
+#bump when the format of the cached results changes
+CACHE_VERSION = 2
+
+
+def dataset_fingerprint(manifest):
+    """Return a hash identifying the data described by the ingest ``manifest``."""
+    hashes = sorted(entry['hash'] for entry in manifest['files'].values())
+    return hashlib.sha256('\n'.join(hashes).encode()).hexdigest()
+
+
+def result_key(name, params=None):
+    """Return the cache key of question ``name`` asked with ``params``.
+
+    The pandas and numpy versions are part of the key, since pickled results
+    can't always be loaded by other versions.
+    """
+    payload = json.dumps({'version': CACHE_VERSION, 'pandas': pd.__version__, 'numpy': np.__version__,
+                          'name': name, 'params': params or {}}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Question results stored as pickles under ``cache_dir``.
+
+    Results of the current dataset live in a folder named after its
+    fingerprint; folders of other fingerprints are removed as soon as a
+    different dataset is used. At most ``max_bytes`` are kept, evicting the
+    least recently used results first.
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 2**20):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def for_store(cls, store_dir=storage.STORE_DIR, **kwargs):
+        """Return the cache kept in the store folder ``store_dir``."""
+        return cls(pathlib.Path(store_dir) / RESULTS_DIR, **kwargs)
+
+    def _folder(self, fingerprint):
+        folder = self.cache_dir / fingerprint[:32]
+        #dropping the results of any other (outdated) dataset
+        if self.cache_dir.exists():
+            for other in self.cache_dir.iterdir():
+                if other.is_dir() and other != folder:
+                    shutil.rmtree(other, ignore_errors=True)
+        return folder
+
+    def get(self, fingerprint, name, params=None):
+        """Return the cached result of question ``name``, or None if there is none."""
+        path = self._folder(fingerprint) / '{}.pkl'.format(result_key(name, params))
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as file:
+                result = pickle.load(file)
+        except Exception:
+            #an unreadable result (e.g. truncated, or pickled by other library versions) is a miss
+            path.unlink(missing_ok=True)
+            return None
+        #marking the result as recently used
+        os.utime(path)
+        return result
+
+    def put(self, fingerprint, name, result, params=None):
+        """Store ``result`` as the result of question ``name`` and evict old results if needed."""
+        folder = self._folder(fingerprint)
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / '{}.pkl'.format(result_key(name, params))
+        tmp_path = path.with_suffix('.pkl.tmp')
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used results until the cache fits in ``max_bytes``."""
+        entries = []
+        for path in self.cache_dir.glob('*/*.pkl'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Delete every cached result."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,178 @@
+"""Command line interface: ``python -m sales_analysis DATA_DIR -q 1 6``.
+
+Ingests the monthly csv files in DATA_DIR (only the new or changed ones) and
+answers the requested questions, reusing the cached results of earlier runs
+on the same data. Nothing is plotted, and matplotlib isn't even imported,
+unless ``--plot`` (interactive charts) or ``--render DIR`` (headless image
+files, see :mod:`sales_analysis.render`) is given. With ``--backend sql``
+the questions are answered by SQL queries over the store instead (see
+:mod:`sales_analysis.sql`). With ``--watch`` it keeps running, ingesting new
+files as they arrive (see :mod:`sales_analysis.service`).
+"""
+
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+from sales_analysis import storage
+from sales_analysis.cache import ResultCache
+from sales_analysis.dates import label_hours, label_months
+from sales_analysis.instrument import Instrument, stage
+from sales_analysis.questions import QUESTIONS, SalesData, run_questions
+
+
+def _usd(amount):
+    return '${:,.2f}'.format(amount)
+
+
+def format_results(number, results):
+    """Return the results of question ``number`` as readable text."""
+    if number == 1:
+        table = label_months(results['sales_per_month']).assign(Sales=lambda df: df['Sales'].map(_usd))
+        return '{}\n\nThe best month for sales was: {} ({} earned)'.format(
+            table.rename_axis('Months'), results['best_month'], _usd(results['best_month_sales']))
+    if number == 2:
+        table = results['sales_per_city'].map(_usd).to_frame('Total Sales Amount')
+        return '{}\n\nThe city that sold the most products is: {}'.format(table, results['best_city'])
+    if number == 3:
+        return '{}\n\nThe product that was sold the most is: {}'.format(
+            results['products_sold'].to_frame('Total Quantity Sold'), results['most_sold_product'])
+    if number == 4:
+        table = pd.DataFrame({'Total Quantity Sold': results['products_quantity'],
+                              'Price': results['products_prices'].map(_usd)})
+        return ('{}\n\nCorrelation of price and quantity sold: {:.2f} (by rank: {:.2f})\n'
+                'Elasticity across products: {:.2f} (% change in quantity sold per 1% higher price)').format(
+            table, results['correlation'], results['rank_correlation'], results['elasticity'])
+    if number == 5:
+        if results['most_sold_together'] is None:
+            return 'No products were sold together.'
+        return '{}\n\nThe two products sold together the most often are: {}'.format(
+            results['orders_frequency'].head(10).to_frame('Frequency of products sold together'),
+            ' and '.join(results['most_sold_together']))
+    if number == 6:
+        return '{}\n\nThe best time of day for displaying advertisements is: {}'.format(
+            label_hours(results['purchases_per_hour']).to_frame('Total Quantity Sold').rename_axis('Time of Purchase'),
+            results['best_hour'])
+    raise ValueError('Unknown question: {}'.format(number))
+
+
+def _to_json(value):
+    #pandas results become {label: value} mappings, keyed by their (named) index;
+    # tables without a named index (e.g. the product pairs) become lists of records
+    if isinstance(value, pd.Series):
+        return {str(key): _to_json(item) for key, item in value.items()}
+    if isinstance(value, pd.DataFrame):
+        if value.index.name is None:
+            return [{col: _to_json(item) for col, item in row.items()} for row in value.to_dict('records')]
+        return {str(key): {col: _to_json(item) for col, item in row.items()}
+                for key, row in value.to_dict('index').items()}
+    if isinstance(value, tuple):
+        return list(value)
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def results_to_json(results):
+    """Return the results of several questions (by number) as JSON-compatible data."""
+    return {str(number): {name: _to_json(value) for name, value in answer.items()}
+            for number, answer in results.items()}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m sales_analysis',
+                                     description='Answer the sales analysis questions for a folder of monthly csv files.')
+    parser.add_argument('data_dir', help='folder with the monthly sales csv files')
+    parser.add_argument('-q', '--questions', type=int, nargs='+', choices=sorted(QUESTIONS),
+                        help='the questions to answer (default: all, or 1 2 3 6 with --watch)')
+    parser.add_argument('--store', default=storage.STORE_DIR, help='folder of the ingested data (default: %(default)r)')
+    parser.add_argument('--workers', type=int, help='processes used to read new files (default: one per core)')
+    parser.add_argument('--no-cache', action='store_true', help="don't reuse (or store) results of earlier runs")
+    parser.add_argument('--backend', choices=['pandas', 'sql'], default='pandas',
+                        help='answer the questions with pandas or with SQL queries in DuckDB (never cached)')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--plot', action='store_true', help='show the charts of the questions that have one')
+    parser.add_argument('--render', metavar='DIR', help='save the charts to image files in DIR, without showing them')
+    parser.add_argument('--chart-format', choices=['png', 'svg', 'pdf'], default='png', help='format of the rendered charts')
+    parser.add_argument('--slice-by', nargs='+', default=[], choices=['City', 'Product', 'Month', 'Hour'],
+                        help='also render the monthly and hourly charts for every city, product, ...')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running: ingest new files as they arrive and refresh the results (see --port)')
+    parser.add_argument('--port', type=int, help='with --watch, serve the latest results over HTTP on this local port')
+    parser.add_argument('--interval', type=float, default=5.0, help='with --watch, seconds between checks of DATA_DIR')
+    parser.add_argument('--metrics', metavar='PATH', help='write the time, rows and memory of every stage as JSON to PATH')
+    parser.add_argument('--prometheus', metavar='PATH', help='also write the stage metrics to PATH in the Prometheus text format')
+    parser.add_argument('--profile', action='store_true', help='add the cProfile hot spots of every stage to the metrics')
+    parser.add_argument('--trace-memory', action='store_true', help='add the tracemalloc peak of every stage to the metrics')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.watch:
+        return watch(args)
+    args.questions = args.questions or sorted(QUESTIONS)
+    if not (args.metrics or args.prometheus):
+        return run(args)
+    with Instrument(profile=args.profile, trace_memory=args.trace_memory) as instrument:
+        status = run(args)
+    if args.metrics:
+        instrument.write_json(args.metrics)
+    if args.prometheus:
+        instrument.write_prometheus(args.prometheus)
+    return status
+
+
+def watch(args):
+    """Run the service mode (see :mod:`sales_analysis.service`) until interrupted."""
+    import asyncio
+    from sales_analysis.service import WATCHED_QUESTIONS, SalesService
+    service = SalesService(args.data_dir, args.store, interval=args.interval, workers=args.workers,
+                           questions=args.questions or WATCHED_QUESTIONS)
+    try:
+        asyncio.run(service.serve(port=args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run(args):
+    """Answer the questions (and plot or render the charts) for the parsed command line ``args``."""
+    with stage('ingest'):
+        data = SalesData.from_directory(args.data_dir, args.store, workers=args.workers)
+    with stage('questions'):
+        if args.backend == 'sql':
+            from sales_analysis.sql import SqlBackend
+            results = SqlBackend.from_store(args.store, threads=args.workers).run_questions(args.questions)
+        else:
+            cache = None if args.no_cache else ResultCache.for_store(args.store)
+            results = run_questions(data, args.questions, cache=cache)
+
+    if args.json:
+        print(json.dumps(results_to_json(results), indent=2))
+    else:
+        for number, answer in results.items():
+            print('Question {}: {}'.format(number, QUESTIONS[number].__doc__.splitlines()[0].split(': ', 1)[1]))
+            print(format_results(number, answer))
+            print('')
+
+    if args.render:
+        from sales_analysis.render import question_jobs, render_charts, sliced_jobs
+        jobs = question_jobs(results, args.render, args.chart_format)
+        for by in args.slice_by:
+            kinds = [kind for kind, dimension in (('sales_per_month', 'Month'), ('purchases_per_hour', 'Hour')) if dimension != by]
+            jobs += sliced_jobs(data.cube, by, args.render, kinds, args.chart_format)
+        with stage('render', len(jobs)):
+            paths = render_charts(jobs, workers=args.workers)
+        print('Rendered {} charts to {}'.format(len(paths), args.render), file=sys.stderr if args.json else sys.stdout)
+
+    if args.plot:
+        from sales_analysis.plots import PLOTS
+        import matplotlib.pyplot as plt
+        for number, answer in results.items():
+            if number in PLOTS:
+                PLOTS[number](answer)
+        plt.show()
+    return 0
@@ -0,0 +1,87 @@
+"""A pre-aggregated sales cube over month x hour x city x product.
+
+The cube holds the quantity ordered, the sales amount and the number of order
+lines for every combination of month, hour of the day, city and product that
+occurs in the data. It is a few thousand rows however many orders there are,
+so Questions 1, 2, 3, 4 and 6 (and new slices such as city by hour) are
+answered by rolling it up instead of rescanning the raw rows.
+"""
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from sales_analysis import storage
+from sales_analysis.dates import hour_column, month_column
+from sales_analysis.geo import city_column
+from sales_analysis.instrument import stage
+
+
+DIMENSIONS = ['Month', 'Hour', 'City', 'Product']
+MEASURES = ['Quantity Ordered', 'Sales', 'Orders']
+CUBE_NAME = 'Sales Cube'
+
+#compact types of the cube coloumns (City and Product are categoricals)
+CUBE_TYPES = {'Month': 'int8', 'Hour': 'int8', 'Quantity Ordered': 'int64', 'Sales': 'float64', 'Orders': 'int64'}
+
+
+def _aggregate(frame):
+    #summing the measures for every combination of the dimensions that occurs
+    cube = frame.groupby(DIMENSIONS, observed=True, sort=True)[MEASURES].sum().reset_index()
+    return cube.astype(CUBE_TYPES)
+
+
+def build_cube(df):
+    """Build the cube from the cleaned sales data ``df``.
+
+    'Orders' counts order lines (rows), so an order of several different
+    products counts once for each of them. A 'City' column already in
+    ``df`` (see :mod:`sales_analysis.schema`) is used as it is.
+    """
+    with stage('cube.build', len(df)) as record:
+        cities = df['City'] if 'City' in df else city_column(df['Purchase Address'])
+        frame = pd.DataFrame({
+            'Month': month_column(df['Order Date']),
+            'Hour': hour_column(df['Order Date']),
+            'City': cities.astype('category'),
+            'Product': df['Product'].astype('category'),
+            'Quantity Ordered': df['Quantity Ordered'].astype('int64'),
+            'Sales': df['Quantity Ordered'] * df['Price Each'].astype('float64'),
+            'Orders': 1,
+        })
+        cube = _aggregate(frame)
+        record['rows_out'] = len(cube)
+    return cube
+
+
+def merge_cubes(cubes):
+    """Combine several cubes (e.g. one per monthly file) into one."""
+    cubes = list(cubes)
+    if not cubes:
+        raise ValueError('No cubes to merge')
+    #giving the categorical coloumns the same categories before joining the cubes
+    categoricals = {col: union_categoricals([cube[col] for cube in cubes], sort_categories=True)
+                    for col in ('City', 'Product')}
+    merged = pd.concat([cube.drop(columns=list(categoricals)) for cube in cubes], ignore_index=True)
+    for col, values in categoricals.items():
+        merged[col] = values
+    return _aggregate(merged[DIMENSIONS + MEASURES])
+
+
+def save_cube(cube, store_dir=storage.STORE_DIR):
+    """Store ``cube`` in ``store_dir``."""
+    return storage.save_frame(cube, CUBE_NAME, store_dir)
+
+
+def load_cube(store_dir=storage.STORE_DIR):
+    """Load the stored cube from ``store_dir``."""
+    return storage.load_frame(CUBE_NAME, store_dir)
+
+
+def rollup(cube, by, measures=MEASURES):
+    """Sum the ``measures`` of ``cube`` over every dimension not listed in ``by``.
+
+    ``by`` is a dimension name or a list of them, e.g. ``['City', 'Hour']``
+    for sales by city and hour of the day.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    return cube.groupby(by, observed=True, sort=True)[list(measures)].sum()
@@ -0,0 +1,40 @@
+"""Month and hour keys derived from the parsed 'Order Date' column.
+
+'Order Date' is parsed once into a datetime column; months (1-12) and hours
+(0-23) are stored as compact int8 keys, which group and sort naturally. The
+display labels ('Jan', '12 AM', ...) are only applied when formatting output.
+"""
+
+import calendar
+
+
+#the format of the 'Order Date' entries in the csv files (month/day/year)
+DATE_FORMAT = '%m/%d/%y %H:%M'
+
+#display labels, indexed by month number (1-12) and hour of the day (0-23)
+MONTH_LABELS = {month: calendar.month_abbr[month] for month in range(1, 13)}
+MONTH_NAMES = {month: calendar.month_name[month] for month in range(1, 13)}
+HOUR_LABELS = {hour: '{:02d} {}'.format(hour % 12 or 12, 'AM' if hour < 12 else 'PM') for hour in range(24)}
+
+
+def month_column(dates):
+    """Return the month number (1-12) of the datetime Series ``dates`` as int8."""
+    return dates.dt.month.astype('int8')
+
+
+def hour_column(dates):
+    """Return the hour of the day (0-23) of the datetime Series ``dates`` as int8."""
+    return dates.dt.hour.astype('int8')
+
+
+def label_months(data, names=False):
+    """Return ``data`` (indexed by month number) relabelled with month abbreviations.
+
+    With ``names=True`` the full month names are used instead.
+    """
+    return data.rename(index=MONTH_NAMES if names else MONTH_LABELS)
+
+
+def label_hours(data):
+    """Return ``data`` (indexed by hour of the day) relabelled as '12 AM', '01 AM', ..."""
+    return data.rename(index=HOUR_LABELS)
@@ -0,0 +1,53 @@
+"""Extracting locations from the 'Purchase Address' column.
+
+Addresses look like "917 1st St, Dallas, TX 75001". The street is stripped off
+with one vectorized string operation, which leaves only a handful of distinct
+"City, ST ZIP" tails; those are parsed once and mapped back to the rows as
+categorical codes.
+"""
+
+import pandas as pd
+
+
+def get_city_state(address):
+    """Return the "City (ST)" part of a single purchase address."""
+    address = address.split(', ')
+    city = address[1]
+    state = address[2][0:2]
+    return "{} ({})".format(city, state)
+
+
+def parse_addresses(addresses):
+    """Split the Series ``addresses`` into categorical location columns.
+
+    Returns a dataframe with the same index and the columns 'City' (as
+    "City (ST)", matching :func:`get_city_state`), 'State' and 'ZIP'.
+    Missing addresses give missing values.
+    """
+    #dropping the street (everything up to the first comma) in one pass over the rows
+    tails = addresses.astype('string[pyarrow]').str.replace(r'^[^,]*, ', '', regex=True)
+    codes, uniques = pd.factorize(tails)
+
+    #parsing only the distinct "City, ST ZIP" tails
+    parts = pd.Series(uniques, dtype=object).str.split(', ', n=1, expand=True)
+    state_zip = parts[1].str.split(' ', n=1, expand=True)
+    state = state_zip[0].str[:2]
+    city = parts[0] + ' (' + state + ')'
+
+    def to_column(values):
+        #turning the parsed values of the distinct tails into a categorical column of all rows
+        labels, categories = pd.factorize(values, sort=True)
+        row_codes = labels[codes]
+        row_codes[codes == -1] = -1
+        return pd.Series(pd.Categorical.from_codes(row_codes, categories=categories), index=addresses.index)
+
+    return pd.DataFrame({
+        'City': to_column(city),
+        'State': to_column(state),
+        'ZIP': to_column(state_zip[1]),
+    })
+
+
+def city_column(addresses):
+    """Return the "City (ST)" of every address in ``addresses`` as a categorical Series."""
+    return parse_addresses(addresses)['City']
@@ -0,0 +1,201 @@
+"""Incremental ingest of the monthly sales files.
+
+A manifest in the store folder records the path, size, modification time and
+content hash of every csv file ingested so far. Running :func:`ingest` again
+only reads and cleans the files that are new or have changed; the cleaned data
+of each file is kept as its own part of the store, so adding a month costs one
+file's worth of work. Each part also gets its own small aggregate cube (see
+:mod:`sales_analysis.cube`), and the cube of the whole store is rebuilt by
+merging those. The daily sales of each part and of the whole store (see
+:mod:`sales_analysis.timeseries`) are kept the same way.
+
+The files are checked row by row as they are read (see
+:mod:`sales_analysis.validate`): only the valid rows go into the store, and
+the rejected ones are kept with their reason in the quarantine folder.
+"""
+
+import hashlib
+import json
+import pathlib
+
+import pandas as pd
+
+from sales_analysis import cube, storage, timeseries
+from sales_analysis.instrument import stage
+from sales_analysis.loader import concat_frames, iter_files
+from sales_analysis.validate import COLUMNS, read_validated
+
+
+MANIFEST_NAME = 'manifest.json'
+PARTS_DIR = 'parts'
+CUBES_DIR = 'cubes'
+DAILY_DIR = 'daily'
+QUARANTINE_DIR = 'quarantine'
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of the contents of ``path``."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(store_dir=storage.STORE_DIR):
+    """Return the ingest manifest (an empty one if nothing was ingested yet)."""
+    path = pathlib.Path(store_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {'files': {}}
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_manifest(manifest, store_dir=storage.STORE_DIR):
+    """Write ``manifest`` to the store folder."""
+    path = pathlib.Path(store_dir) / MANIFEST_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def _part_name(path, content_hash):
+    #one part per source file, named after the file, its location and its contents
+    #(so identical files with the same name in different folders don't share a part)
+    location = hashlib.sha256(str(pathlib.Path(path).resolve()).encode()).hexdigest()[:8]
+    return '{}-{}-{}'.format(pathlib.Path(path).stem, location, content_hash[:12])
+
+
+def ingest(data_dir, store_dir=storage.STORE_DIR, pattern='*.csv', workers=None):
+    """Ingest the new or changed csv files under ``data_dir`` into the store.
+
+    The files to ingest are cleaned in parallel by ``workers`` processes (see
+    :func:`sales_analysis.loader.iter_files`) and stored one by one as they
+    are ready. Returns a dict listing the
+    files that were 'added', 'changed', 'removed' or left 'unchanged'.
+    """
+    manifest = load_manifest(store_dir)
+    known = manifest['files']
+    parts_dir = pathlib.Path(store_dir) / PARTS_DIR
+    cubes_dir = pathlib.Path(store_dir) / CUBES_DIR
+    daily_dir = pathlib.Path(store_dir) / DAILY_DIR
+    quarantine_dir = pathlib.Path(store_dir) / QUARANTINE_DIR
+    cube_path = storage.frame_path(cube.CUBE_NAME, store_dir)
+    daily_path = storage.frame_path(timeseries.DAILY_NAME, store_dir)
+    report = {'added': [], 'changed': [], 'removed': [], 'unchanged': []}
+
+    seen = set()
+    pending = []
+    for path in sorted(pathlib.Path(data_dir).rglob(pattern)):
+        key = str(path.resolve())
+        seen.add(key)
+        stat = path.stat()
+        entry = known.get(key)
+
+        #files with the same size and modification time are taken to be unchanged (no need to hash them)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            report['unchanged'].append(key)
+            continue
+
+        content_hash = file_hash(path)
+        if entry and entry['hash'] == content_hash:
+            #only touched, not modified
+            entry['mtime'] = stat.st_mtime
+            report['unchanged'].append(key)
+            continue
+
+        pending.append((path, key, stat, content_hash, entry))
+
+    #reading and cleaning only the new or changed files, then storing each as its own part
+    #(the rows that fail validation are quarantined with their reason instead of being dropped;
+    # each file is stored as soon as it is read, so only a few files are in memory at a time)
+    results = iter_files([path for path, *_ in pending], workers, reader=read_validated)
+    for (path, key, stat, content_hash, entry), (df, bad) in zip(pending, results):
+        part = _part_name(path, content_hash)
+        part_cube, part_daily = cube.build_cube(df), timeseries.daily_sales(df)
+        with stage('ingest.store_part', len(df)) as record:
+            storage.save_frame(df, part, parts_dir)
+            storage.save_frame(part_cube, part, cubes_dir)
+            timeseries.save_daily(part_daily, part, daily_dir)
+            if len(bad):
+                storage.save_frame(bad, part, quarantine_dir)
+            record['rows_out'] = len(df)
+        if entry and entry['part'] != part:
+            _remove_part(entry['part'], store_dir)
+
+        known[key] = {'path': key, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                      'hash': content_hash, 'part': part, 'rows': len(df), 'quarantined': len(bad)}
+        report['changed' if entry else 'added'].append(key)
+
+    #dropping the parts of files that no longer exist
+    for key in sorted(set(known) - seen):
+        _remove_part(known.pop(key)['part'], store_dir)
+        report['removed'].append(key)
+
+    #rebuilding the cube and daily sales of the whole store from the (small) ones of its parts
+    modified = report['added'] or report['changed'] or report['removed']
+    if modified or not cube_path.exists() or not daily_path.exists():
+        if known:
+            parts = [entry['part'] for _, entry in sorted(known.items())]
+            with stage('ingest.merge', len(parts)) as record:
+                merged = cube.merge_cubes(_part_cube(part, store_dir) for part in parts)
+                cube.save_cube(merged, store_dir)
+                timeseries.save_daily(timeseries.merge_daily(_part_daily(part, store_dir) for part in parts),
+                                      store_dir=store_dir)
+                record['rows_out'] = len(merged)
+        else:
+            cube_path.unlink(missing_ok=True)
+            daily_path.unlink(missing_ok=True)
+
+    save_manifest(manifest, store_dir)
+    return report
+
+
+def _part_cube(part, store_dir):
+    #the cube of a part (built from its data for parts stored before cubes were kept)
+    cubes_dir = pathlib.Path(store_dir) / CUBES_DIR
+    if not storage.frame_path(part, cubes_dir).exists():
+        storage.save_frame(cube.build_cube(storage.load_frame(part, pathlib.Path(store_dir) / PARTS_DIR)), part, cubes_dir)
+    return storage.load_frame(part, cubes_dir)
+
+
+def _part_daily(part, store_dir):
+    #the daily sales of a part (computed from its data for parts stored before they were kept)
+    daily_dir = pathlib.Path(store_dir) / DAILY_DIR
+    if not storage.frame_path(part, daily_dir).exists():
+        df = storage.load_frame(part, pathlib.Path(store_dir) / PARTS_DIR, columns=['Quantity Ordered', 'Price Each', 'Order Date'])
+        timeseries.save_daily(timeseries.daily_sales(df), part, daily_dir)
+    return timeseries.load_daily(part, daily_dir)
+
+
+def _remove_part(part, store_dir):
+    #deleting the stored data, cube, daily sales and quarantined rows of a part
+    for folder in (PARTS_DIR, CUBES_DIR, DAILY_DIR, QUARANTINE_DIR):
+        storage.frame_path(part, pathlib.Path(store_dir) / folder).unlink(missing_ok=True)
+
+
+def load_ingested(store_dir=storage.STORE_DIR, columns=None):
+    """Load all the ingested (cleaned) sales data as one dataframe."""
+    manifest = load_manifest(store_dir)
+    parts_dir = pathlib.Path(store_dir) / PARTS_DIR
+    frames = [storage.load_frame(entry['part'], parts_dir, columns=columns)
+              for _, entry in sorted(manifest['files'].items())]
+    if not frames:
+        raise FileNotFoundError('Nothing has been ingested into {} yet'.format(store_dir))
+    return concat_frames(frames)
+
+
+def load_quarantine(store_dir=storage.STORE_DIR):
+    """Load the rows rejected while ingesting, with their 'Reason', 'Source' file and 'Row'.
+
+    The rows that couldn't be split into the columns only have their 'Text'.
+    """
+    manifest = load_manifest(store_dir)
+    quarantine_dir = pathlib.Path(store_dir) / QUARANTINE_DIR
+    frames = [storage.load_frame(entry['part'], quarantine_dir)
+              for _, entry in sorted(manifest['files'].items()) if entry.get('quarantined')]
+    if not frames:
+        return pd.DataFrame(columns=['Reason', 'Source', 'Row'] + COLUMNS + ['Text'])
+    return concat_frames(frames)
@@ -0,0 +1,211 @@
+"""Timing and memory instrumentation of the pipeline stages.
+
+The slow steps of the pipeline (reading, validating, the cube, every
+question, ...) are wrapped in :func:`stage` blocks, which do nothing unless
+an :class:`Instrument` is active. Inside ``with Instrument() as instrument:``
+every stage records its wall and CPU time, the rows going in and out, and the
+resident memory at its start, end and peak. ``profile=True`` also runs the
+outermost stages under cProfile, and ``trace_memory=True`` records the peak
+memory allocated through Python (both slow the run down a lot). The records
+can be written as JSON or as a Prometheus text file.
+
+Stages run in worker processes (see :func:`sales_analysis.loader.iter_files`)
+are not recorded; use ``workers=1`` to instrument them.
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pathlib
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+
+#the instrument recording the stages of this process, if any
+_active = None
+
+
+def current_rss():
+    """Return the resident memory of this process in bytes (its peak so far off Linux)."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        #ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+class RssSampler:
+    """Track the peak resident memory while the ``with`` block runs."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = self.peak = current_rss()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.end = current_rss()
+        self.peak = max(self.peak, self.end)
+
+
+class Instrument:
+    """Record the time, rows and memory of every stage run while it is active.
+
+    ``profile`` keeps the ``profile_top`` functions with the most cumulative
+    time of every outermost stage; ``trace_memory`` adds the peak of the
+    memory traced by tracemalloc.
+    """
+
+    def __init__(self, profile=False, trace_memory=False, profile_top=15):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.profile_top = profile_top
+        self.stages = []
+        self._open = []
+        self._previous = None
+
+    def __enter__(self):
+        global _active
+        self._previous, _active = _active, self
+        if self.trace_memory:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        if self.trace_memory:
+            tracemalloc.stop()
+        _active = self._previous
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """Record the stage ``name``; set ``record['rows_out']`` on the yielded record."""
+        record = {'stage': name, 'depth': len(self._open), 'rows_in': rows_in, 'rows_out': None}
+        profiler = cProfile.Profile() if self.profile and not self._open else None
+        if self.trace_memory:
+            #the peak so far belongs to the enclosing stage, then it starts again for this one
+            self._note_traced_peak()
+            tracemalloc.reset_peak()
+            record['_traced_peak'] = 0
+        self._open.append(record)
+        try:
+            with RssSampler() as rss:
+                start, cpu_start = time.perf_counter(), time.process_time()
+                if profiler:
+                    profiler.enable()
+                try:
+                    yield record
+                finally:
+                    if profiler:
+                        profiler.disable()
+                    seconds, cpu_seconds = time.perf_counter() - start, time.process_time() - cpu_start
+        finally:
+            self._open.pop()
+        record.update(seconds=round(seconds, 6), cpu_seconds=round(cpu_seconds, 6),
+                      rss_start_bytes=rss.start, rss_peak_bytes=rss.peak, rss_end_bytes=rss.end)
+        if self.trace_memory:
+            record['traced_peak_bytes'] = max(record.pop('_traced_peak'), tracemalloc.get_traced_memory()[1])
+            if self._open:
+                self._open[-1]['_traced_peak'] = max(self._open[-1]['_traced_peak'], record['traced_peak_bytes'])
+        if profiler:
+            record['profile'] = _top_functions(profiler, self.profile_top)
+        self.stages.append(record)
+
+    def _note_traced_peak(self):
+        if self._open:
+            self._open[-1]['_traced_peak'] = max(self._open[-1]['_traced_peak'], tracemalloc.get_traced_memory()[1])
+
+    def totals(self):
+        """Return the records summed per stage name (calls, times, rows) with the highest memory peaks."""
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record['stage'], {'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0,
+                                                        'rows_in': 0, 'rows_out': 0, 'rss_peak_bytes': 0})
+            total['calls'] += 1
+            for key in ('seconds', 'cpu_seconds', 'rows_in', 'rows_out'):
+                total[key] += record[key] or 0
+            for key in ('rss_peak_bytes', 'traced_peak_bytes'):
+                if key in record:
+                    total[key] = max(total.get(key, 0), record[key])
+            total['seconds'], total['cpu_seconds'] = round(total['seconds'], 6), round(total['cpu_seconds'], 6)
+        return totals
+
+    def write_json(self, path):
+        """Write every stage record, and the totals per stage, as JSON to ``path``."""
+        report = {'created': time.time(), 'pid': os.getpid(), 'stages': self.stages, 'totals': self.totals()}
+        _write_text(path, json.dumps(report, indent=2))
+
+    def write_prometheus(self, path, prefix='sales_analysis'):
+        """Write the totals per stage to ``path`` in the Prometheus text exposition format."""
+        metrics = [('calls', 'Number of times the stage ran.'),
+                   ('seconds', 'Wall time spent in the stage.'),
+                   ('cpu_seconds', 'CPU time of this process spent in the stage.'),
+                   ('rows_in', 'Rows going into the stage.'),
+                   ('rows_out', 'Rows coming out of the stage.'),
+                   ('rss_peak_bytes', 'Highest resident memory during the stage.'),
+                   ('traced_peak_bytes', 'Highest memory traced by tracemalloc during the stage.')]
+        totals = self.totals()
+        lines = []
+        for metric, description in metrics:
+            samples = [(name, total[metric]) for name, total in totals.items() if metric in total]
+            if not samples:
+                continue
+            lines.append('# HELP {}_stage_{} {}'.format(prefix, metric, description))
+            lines.append('# TYPE {}_stage_{} gauge'.format(prefix, metric))
+            lines += ['{}_stage_{}{{stage="{}"}} {}'.format(prefix, metric, _label(name), value)
+                      for name, value in samples]
+        _write_text(path, '\n'.join(lines) + '\n')
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    """Record the stage ``name`` with the active :class:`Instrument` (a no-op without one).
+
+    Yields a dict on which the stage can set 'rows_out'.
+    """
+    if _active is None:
+        yield {}
+        return
+    with _active.stage(name, rows_in) as record:
+        yield record
+
+
+def _top_functions(profiler, count):
+    #the functions with the most cumulative time, as printed by pstats
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats('cumulative')
+    top = []
+    for (filename, line, function), (calls, _, own, cumulative, _) in stats.stats.items():
+        top.append({'function': '{}:{}({})'.format(filename, line, function), 'calls': calls,
+                    'own_seconds': round(own, 6), 'cumulative_seconds': round(cumulative, 6)})
+    top.sort(key=lambda item: item['cumulative_seconds'], reverse=True)
+    return top[:count]
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _write_text(path, text):
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(text)
+    tmp_path.replace(path)
@@ -0,0 +1,79 @@
+"""Parallel loading and cleaning of the monthly sales files.
+
+Each csv file is read and cleaned in its own worker process (with the
+schema-driven reader of :mod:`sales_analysis.schema`) and the typed results
+are concatenated once at the end, so loading a large archive of monthly files
+scales with the number of cores.
+"""
+
+import collections
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from sales_analysis.schema import read_sales
+
+
+def default_workers():
+    """Return the default number of worker processes (one per core)."""
+    return os.cpu_count() or 1
+
+
+def iter_files(paths, workers=None, reader=read_sales):
+    """Read and clean every file in ``paths``, yielding the results in order as they are ready.
+
+    ``workers`` is the number of worker processes (by default one per core);
+    with a single worker, or a single file, everything runs in this process.
+    ``reader`` reads one file (it must be a module-level function, so it can
+    be sent to the workers). At most ``workers`` files are submitted ahead of
+    the one being consumed, so only about ``workers + 1`` files are held in
+    memory however many there are, even when the consumer is slower than the
+    workers.
+    """
+    paths = list(paths)
+    workers = default_workers() if workers is None else workers
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield reader(path)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        #submitting the next file each time a result is taken, instead of all of them at once
+        pending = collections.deque(pool.submit(reader, path) for path in paths[:workers])
+        for path in paths[workers:]:
+            result = pending.popleft().result()
+            pending.append(pool.submit(reader, path))
+            yield result
+        while pending:
+            yield pending.popleft().result()
+
+
+def clean_files(paths, workers=None, reader=read_sales):
+    """Read and clean every file in ``paths`` and return the frames in order (see :func:`iter_files`)."""
+    return list(iter_files(paths, workers, reader))
+
+
+def load_sales(data_dir, workers=None, pattern='*.csv'):
+    """Load and clean all the csv files under ``data_dir`` into one dataframe."""
+    paths = sorted(pathlib.Path(data_dir).rglob(pattern))
+    if not paths:
+        raise FileNotFoundError('No files matching {!r} in {}'.format(pattern, data_dir))
+    return concat_frames(clean_files(paths, workers))
+
+
+def concat_frames(frames):
+    """Concatenate ``frames``, keeping the categorical columns categorical.
+
+    Frames read from different files can have different categories (e.g. a
+    product only sold in some months); these are merged instead of falling
+    back to plain text.
+    """
+    frames = list(frames)
+    df = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = union_categoricals([frame[col] for frame in frames], sort_categories=True)
+    return df
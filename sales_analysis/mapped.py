@@ -0,0 +1,188 @@
+"""A memory-mapped columnar copy of the store for repeated interactive analysis.
+
+Every cleaned column is kept as its own ``.npy`` file: 'Order ID',
+'Quantity Ordered', 'Price Each', 'Order Date' (as datetime64) and the
+dictionary-encoded 'Product' and 'City' (small integer codes, plus the list of
+names). Opening the store only reads the headers and maps the files, which
+takes milliseconds; the data are paged in by the OS as they are used and the
+pages are shared by every process that maps the same files, so concurrent
+sessions don't each hold a copy of the dataset.
+
+The mapped columns are built from the ingested parts (see
+:mod:`sales_analysis.ingest`) the first time they are opened, and again
+whenever the ingested data change. Each build goes into a new folder, so
+sessions that still have an older build open keep working.
+"""
+
+import contextlib
+import fcntl
+import json
+import pathlib
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from sales_analysis import storage
+from sales_analysis.cache import dataset_fingerprint
+from sales_analysis.ingest import load_ingested, load_manifest
+
+
+MAPPED_DIR = 'mapped'
+CURRENT_NAME = 'current.json'
+LOCK_NAME = 'build.lock'
+
+#the mapped columns and the types they are stored as (the categoricals as codes)
+COLUMN_TYPES = {
+    'Order ID': 'int32',
+    'Quantity Ordered': 'int32',
+    'Price Each': 'float32',
+    'Order Date': 'datetime64[us]',
+    'Product': 'category',
+    'City': 'category',
+}
+
+
+def _file_name(col):
+    return col.lower().replace(' ', '_') + '.npy'
+
+
+def _codes_type(categories):
+    #the smallest integer type for the codes (-1 is a missing value)
+    return np.int8 if len(categories) < 128 else np.int16 if len(categories) < 32768 else np.int32
+
+
+@contextlib.contextmanager
+def _build_lock(root):
+    #one process at a time builds and switches the current build (the lock is released on close)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / LOCK_NAME, 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        yield
+
+
+def _read_current(root):
+    path = root / CURRENT_NAME
+    if not path.exists():
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def _stale(root, current, fingerprint):
+    #no build yet, or one of other data, or one that was deleted
+    return current is None or current['fingerprint'] != fingerprint or not (root / current['build']).exists()
+
+
+def build_mapped(df, store_dir=storage.STORE_DIR, fingerprint=None):
+    """Write the columns of the cleaned sales data ``df`` as a new mapped build of the store.
+
+    The build becomes the current one once it is complete; older builds are
+    deleted (processes that have them mapped can keep using them).
+    """
+    root = pathlib.Path(store_dir) / MAPPED_DIR
+    with _build_lock(root):
+        return _build(df, root, fingerprint)
+
+
+def _build(df, root, fingerprint):
+    #(called with the build lock held)
+    build = root / uuid.uuid4().hex[:16]
+    tmp_build = build.with_name(build.name + '.tmp')
+    tmp_build.mkdir(parents=True)
+
+    dictionaries = {}
+    for col, dtype in COLUMN_TYPES.items():
+        if dtype == 'category':
+            values = df[col].astype('category')
+            dictionaries[col] = [str(name) for name in values.cat.categories]
+            array = values.cat.codes.to_numpy().astype(_codes_type(dictionaries[col]))
+        else:
+            array = df[col].to_numpy().astype(dtype, copy=False)
+        np.save(tmp_build / _file_name(col), np.ascontiguousarray(array))
+    with open(tmp_build / 'dictionaries.json', 'w') as file:
+        json.dump(dictionaries, file)
+    tmp_build.rename(build)
+
+    #switching to the new build, then removing the old ones (but not the .tmp folders of unfinished builds)
+    current = {'build': build.name, 'rows': len(df), 'fingerprint': fingerprint}
+    tmp_path = root / (CURRENT_NAME + '.tmp')
+    with open(tmp_path, 'w') as file:
+        json.dump(current, file)
+    tmp_path.replace(root / CURRENT_NAME)
+    for folder in root.iterdir():
+        if folder.is_dir() and folder.name != build.name and not folder.name.endswith('.tmp'):
+            shutil.rmtree(folder, ignore_errors=True)
+    return current
+
+
+class MappedSales:
+    """The memory-mapped columns of a build of the store (read-only).
+
+    Use :func:`open_mapped` to open the current build. :meth:`column` and
+    :meth:`frame` return pandas objects that use the mapped memory directly.
+    """
+
+    def __init__(self, folder, rows, fingerprint=None):
+        self.folder = pathlib.Path(folder)
+        self.rows = rows
+        self.fingerprint = fingerprint
+        with open(self.folder / 'dictionaries.json') as file:
+            self.dictionaries = {col: pd.Index(names, dtype=object) for col, names in json.load(file).items()}
+        #np.load with mmap_mode only reads the header of every file
+        self.arrays = {col: np.load(self.folder / _file_name(col), mmap_mode='r') for col in COLUMN_TYPES}
+
+    def __len__(self):
+        return self.rows
+
+    def codes(self, col):
+        """Return the dictionary codes of the categorical column ``col`` and its names."""
+        return self.arrays[col], self.dictionaries[col]
+
+    def column(self, col):
+        """Return the column ``col`` as a Series (a categorical for 'Product' and 'City'), without copying.
+
+        The categoricals keep the mapped codes as they are (``validate=False``
+        skips the check that would read them all). Note that ``.cat.codes``
+        of the result returns a copy; :meth:`codes` returns the mapped codes.
+        """
+        if col in self.dictionaries:
+            dtype = pd.CategoricalDtype(self.dictionaries[col])
+            #(with the codes already of an integer type, from_codes uses them without a copy)
+            return pd.Series(pd.Categorical.from_codes(self.arrays[col], dtype=dtype, validate=False), name=col, copy=False)
+        return pd.Series(self.arrays[col], name=col, copy=False)
+
+    def frame(self, columns=None):
+        """Return the columns ``columns`` (by default all) as a dataframe, without copying."""
+        columns = list(COLUMN_TYPES) if columns is None else list(columns)
+        return pd.DataFrame({col: self.column(col) for col in columns}, copy=False)
+
+
+def open_mapped(store_dir=storage.STORE_DIR, refresh=True, attempts=5):
+    """Open the current mapped build of the store ``store_dir``.
+
+    With ``refresh`` the columns are (re)built from the ingested parts first
+    if there is no build yet or the ingested data changed since. A build that
+    another process replaces while it is being opened is opened again (up to
+    ``attempts`` times).
+    """
+    root = pathlib.Path(store_dir) / MAPPED_DIR
+    for attempt in range(attempts):
+        current = _read_current(root)
+        if refresh:
+            fingerprint = dataset_fingerprint(load_manifest(store_dir))
+            if _stale(root, current, fingerprint):
+                with _build_lock(root):
+                    #(another process may have built it while this one waited for the lock)
+                    current = _read_current(root)
+                    if _stale(root, current, fingerprint):
+                        current = _build(load_ingested(store_dir, columns=list(COLUMN_TYPES)), root, fingerprint)
+        if current is None:
+            raise FileNotFoundError('No mapped columns in {} yet'.format(store_dir))
+        try:
+            return MappedSales(root / current['build'], current['rows'], current['fingerprint'])
+        except FileNotFoundError:
+            #the build was replaced (and deleted) by another process in the meantime
+            if attempt == attempts - 1:
+                raise
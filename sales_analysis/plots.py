@@ -0,0 +1,98 @@
+"""The charts of the sales analysis.
+
+matplotlib is only imported when a chart is drawn, so using the rest of the
+package (e.g. from a batch job) never pays for it. With ``headless=True`` a
+chart is drawn on a standalone figure that pyplot doesn't know about, which
+can be saved to a file without touching the backend used for showing charts.
+"""
+
+from sales_analysis.dates import label_hours, label_months
+
+
+def _subplots(figsize, headless=False):
+    #a new figure with one set of axes (kept out of pyplot when headless)
+    if headless:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize)
+        return fig, fig.subplots()
+    import matplotlib.pyplot as plt
+    return plt.subplots(figsize=figsize)
+
+
+def _usd_axis(axis):
+    #displaying the amounts in USD (rather than in scientific notation)
+    from matplotlib.ticker import StrMethodFormatter
+    axis.set_major_formatter(StrMethodFormatter('${x:,.0f}'))
+
+
+def plot_sales_per_month(sales_per_month, headless=False):
+    """Bar chart of the sales amount per month (Question 1)."""
+    fig, ax = _subplots((12, 7), headless)
+    ax.bar(label_months(sales_per_month).index.values, sales_per_month['Sales'],
+           color='#407bbf', linewidth=1, edgecolor='k')
+    ax.set_title('Sales Amount Per Month')
+    ax.set_xlabel('Month', fontsize=12)
+    ax.set_ylabel('Sales Amount in USD ($)', fontsize=12)
+    _usd_axis(ax.yaxis)
+    return fig
+
+
+def plot_sales_per_city(sales_per_city, headless=False):
+    """Bar chart of the sales amount per city (Question 2)."""
+    fig, ax = _subplots((10, 7), headless)
+    ax.bar(sales_per_city.index.astype(str), sales_per_city,
+           color='#669099', width=0.6, linewidth=1, edgecolor='k')
+    ax.set_title('Sales Amount Per City')
+    ax.set_xlabel('City', fontsize=12)
+    ax.set_ylabel('Sales Amount in USD ($)', fontsize=12)
+    ax.tick_params(axis='x', labelrotation=60)
+    _usd_axis(ax.yaxis)
+    fig.tight_layout()
+    return fig
+
+
+def plot_price_vs_quantity(products_quantity, products_prices, headless=False):
+    """Twin-axis line chart of the quantity sold and the price of each product (Question 4)."""
+    from matplotlib.ticker import StrMethodFormatter
+    products = products_quantity.index.astype(str)
+    fig, ax1 = _subplots((12, 7), headless)
+    ax1.plot(products, products_quantity, c='#407bbf', lw=2, label='Quantities')
+    ax2 = ax1.twinx()
+    ax2.plot(products, products_prices.reindex(products_quantity.index), c='#bf4040', lw=2, label='Prices')
+
+    ax1.set_title('The Relationship Between Product Price and Quantity Sold')
+    ax1.set_xlabel('Product Name', fontsize=12)
+    ax1.set_ylabel('Total Quantity Sold', fontsize=12, color='#407bbf')
+    ax2.set_ylabel('Prices in USD ($)', fontsize=12, color='#cc3333')
+    ax1.tick_params(axis='x', labelrotation=90)
+    ax1.yaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))
+    _usd_axis(ax2.yaxis)
+    ax1.legend(loc='upper left')
+    ax2.legend(loc='upper right')
+    ax1.grid()
+    fig.tight_layout()
+    return fig
+
+
+def plot_purchases_per_hour(purchases_per_hour, headless=False):
+    """Bar chart of the quantities sold per hour of the day (Question 6)."""
+    from matplotlib.ticker import StrMethodFormatter
+    fig, ax = _subplots((12, 7), headless)
+    ax.bar(label_hours(purchases_per_hour).index.values, purchases_per_hour,
+           color='#404fbf', linewidth=1, edgecolor='k')
+    ax.set_title('Quantities Sold Per Hour')
+    ax.set_xlabel('Time of Day', fontsize=12)
+    ax.set_ylabel('Amount of Quantities Sold', fontsize=12)
+    ax.tick_params(axis='x', labelrotation=90)
+    ax.yaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))
+    fig.tight_layout()
+    return fig
+
+
+#the charts of the questions that have one, drawn from the question's results
+PLOTS = {
+    1: lambda results: plot_sales_per_month(results['sales_per_month']),
+    2: lambda results: plot_sales_per_city(results['sales_per_city']),
+    4: lambda results: plot_price_vs_quantity(results['products_quantity'], results['products_prices']),
+    6: lambda results: plot_purchases_per_hour(results['purchases_per_hour']),
+}
@@ -0,0 +1,92 @@
+"""Per-product price statistics and the price elasticity of demand (Question 4).
+
+:func:`product_stats` summarizes the prices, quantities and orders of every
+product (optionally per month) in one grouped pass, with no Python code run
+per group, so it scales to thousands of products. A product sold at several
+prices simply gets a spread of prices; its 'Average Price' is the price paid
+per unit. The relationship between price and quantity is measured across
+products (:func:`price_quantity_relationship`) and, for products whose price
+changes, over time (:func:`elasticity_over_time`), as the slope of a
+log-log regression of the quantity sold on the price.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def product_stats(df, period=None):
+    """Return the price and sales statistics of every product in the cleaned sales data ``df``.
+
+    With ``period`` ('M' for months, 'W' for weeks, ...) the statistics are
+    computed per product and period instead. The price columns describe the
+    prices of the order lines; 'Average Price' is the sales amount per unit.
+    """
+    frame = pd.DataFrame({
+        'Product': df['Product'],
+        'Price': df['Price Each'].astype('float64'),
+        'Quantity Ordered': df['Quantity Ordered'].astype('int64'),
+        'Sales': df['Quantity Ordered'] * df['Price Each'].astype('float64'),
+        'Order ID': df['Order ID'],
+    })
+    keys = ['Product']
+    if period is not None:
+        frame['Period'] = df['Order Date'].dt.to_period(period)
+        keys.append('Period')
+
+    stats = frame.groupby(keys, observed=True, sort=True).agg(**{
+        'Quantity Ordered': ('Quantity Ordered', 'sum'),
+        'Sales': ('Sales', 'sum'),
+        'Order Lines': ('Order ID', 'size'),
+        'Orders': ('Order ID', 'nunique'),
+        'Min Price': ('Price', 'min'),
+        'Max Price': ('Price', 'max'),
+        'Mean Price': ('Price', 'mean'),
+        'Price Std': ('Price', 'std'),
+        'Prices': ('Price', 'nunique'),
+    })
+    stats['Average Price'] = stats['Sales'] / stats['Quantity Ordered']
+    return stats
+
+
+def _slopes(x, y, groups):
+    #least-squares slopes of y on x per group, from sums that are computed in one grouped pass
+    sums = pd.DataFrame({'n': 1, 'x': x, 'y': y, 'xx': x * x, 'xy': x * y})
+    sums = sums.groupby(groups, observed=True, sort=True).sum()
+    var = sums['xx'] - sums['x'] ** 2 / sums['n']
+    cov = sums['xy'] - sums['x'] * sums['y'] / sums['n']
+    #(no slope without price changes)
+    return cov / var.where(var > 1e-12 * sums['xx'].abs().clip(lower=1))
+
+
+def price_quantity_relationship(quantity, prices):
+    """Measure how the quantity sold of the products relates to their price.
+
+    ``quantity`` and ``prices`` are Series indexed by product (e.g. the
+    results of Question 4). Returns the Pearson and Spearman (rank)
+    correlations and the elasticity across products: the slope of log
+    quantity against log price, so -1 means 1% more expensive products sell
+    about 1% fewer units.
+    """
+    both = pd.DataFrame({'quantity': quantity, 'price': prices}).dropna()
+    both = both[(both['quantity'] > 0) & (both['price'] > 0)]
+    if len(both) < 2:
+        return {'correlation': np.nan, 'rank_correlation': np.nan, 'elasticity': np.nan}
+    return {
+        'correlation': float(both['price'].corr(both['quantity'])),
+        'rank_correlation': float(both['price'].rank().corr(both['quantity'].rank())),
+        'elasticity': float(_slopes(np.log(both['price']).to_numpy(), np.log(both['quantity']).to_numpy(),
+                                    np.zeros(len(both))).iloc[0]),
+    }
+
+
+def elasticity_over_time(stats):
+    """Return the elasticity of every product over time from its per-period ``stats``.
+
+    ``stats`` comes from :func:`product_stats` with a ``period``. For every
+    product, log quantity is regressed on log average price across the
+    periods; products whose price never changed get NaN.
+    """
+    stats = stats[(stats['Quantity Ordered'] > 0) & (stats['Average Price'] > 0)]
+    products = stats.index.get_level_values('Product')
+    slopes = _slopes(np.log(stats['Average Price']).to_numpy(), np.log(stats['Quantity Ordered']).to_numpy(), products)
+    return slopes.rename('Elasticity').rename_axis('Product')
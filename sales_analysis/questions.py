@@ -0,0 +1,164 @@
+"""The six business questions of the sales analysis, one function each.
+
+Every question takes a :class:`SalesData` and returns a dict of its results.
+:class:`SalesData` loads things lazily: Questions 1, 2, 3, 4 and 6 only need
+the small aggregate cube, and Question 5 only the 'Order ID' and 'Product'
+columns, so running a single question never loads more than it needs. With a
+:class:`~sales_analysis.cache.ResultCache`, questions already answered for the
+same data are not computed (or loaded) again.
+"""
+
+from sales_analysis import cube, mapped, pricing, storage
+from sales_analysis.basket import Baskets
+from sales_analysis.cache import dataset_fingerprint
+from sales_analysis.dates import HOUR_LABELS, MONTH_NAMES
+from sales_analysis.ingest import ingest, load_ingested, load_manifest
+from sales_analysis.instrument import stage
+
+
+class SalesData:
+    """Lazily loaded (cleaned) sales data for the questions.
+
+    Use :meth:`from_directory` to ingest a folder of monthly csv files into a
+    store and read from it, or :meth:`from_frame` for data already in memory.
+    """
+
+    def __init__(self, store_dir=storage.STORE_DIR, frame=None):
+        self.store_dir = store_dir
+        self._frame = frame
+        self._cube = None
+
+    @classmethod
+    def from_directory(cls, data_dir, store_dir=storage.STORE_DIR, workers=None):
+        """Ingest the (new or changed) csv files of ``data_dir`` and read from ``store_dir``."""
+        ingest(data_dir, store_dir, workers=workers)
+        return cls(store_dir)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Use the cleaned sales data ``df`` that is already in memory."""
+        return cls(frame=df)
+
+    @property
+    def cube(self):
+        """The aggregate cube (see :mod:`sales_analysis.cube`), built or loaded on first use."""
+        if self._cube is None:
+            self._cube = cube.build_cube(self._frame) if self._frame is not None else cube.load_cube(self.store_dir)
+        return self._cube
+
+    def fingerprint(self):
+        """Return the fingerprint of the ingested data (None for data in memory)."""
+        if self._frame is not None:
+            return None
+        return dataset_fingerprint(load_manifest(self.store_dir))
+
+    def columns(self, names):
+        """Return only the columns ``names`` of the cleaned sales data.
+
+        Columns of the memory-mapped store (see :mod:`sales_analysis.mapped`)
+        are mapped from it instead of being read, if it was built from the
+        current data. It is never (re)built here: that reads the whole store,
+        which costs more than reading the columns once.
+        """
+        if self._frame is not None:
+            return self._frame[list(names)]
+        if set(names) <= set(mapped.COLUMN_TYPES):
+            try:
+                columns = mapped.open_mapped(self.store_dir, refresh=False)
+            except FileNotFoundError:
+                columns = None
+            if columns is not None and columns.fingerprint == self.fingerprint():
+                return columns.frame(names)
+        return load_ingested(self.store_dir, columns=list(names))
+
+
+def best_month(data):
+    """Question 1: What was the best month for sales? How much was earned that month?"""
+    sales_per_month = cube.rollup(data.cube, 'Month', ['Quantity Ordered', 'Sales'])
+    month = sales_per_month['Sales'].idxmax()
+    return {
+        'sales_per_month': sales_per_month,
+        'best_month': MONTH_NAMES[month],
+        'best_month_sales': float(sales_per_month.loc[month, 'Sales']),
+    }
+
+
+def best_city(data):
+    """Question 2: Which city sold the most products?"""
+    sales_per_city = cube.rollup(data.cube, 'City', ['Sales'])['Sales']
+    return {'sales_per_city': sales_per_city, 'best_city': sales_per_city.idxmax()}
+
+
+def top_products(data):
+    """Question 3: Which product sold the most?"""
+    products_sold = cube.rollup(data.cube, 'Product', ['Quantity Ordered'])['Quantity Ordered']
+    products_sold = products_sold.sort_values(ascending=False)
+    return {'products_sold': products_sold, 'most_sold_product': products_sold.index[0]}
+
+
+def price_vs_quantity(data):
+    """Question 4: Is there a relationship between how much a product costs and the quantity sold?
+
+    The price of a product is its average price per unit sold. The
+    correlation and elasticity of quantity and price across products are
+    added (see :func:`sales_analysis.pricing.price_quantity_relationship`).
+    """
+    per_product = cube.rollup(data.cube, 'Product', ['Quantity Ordered', 'Sales'])
+    products_prices = (per_product['Sales'] / per_product['Quantity Ordered']).round(2)
+    return {
+        'products_quantity': per_product['Quantity Ordered'],
+        'products_prices': products_prices,
+        **pricing.price_quantity_relationship(per_product['Quantity Ordered'], products_prices),
+    }
+
+
+def sold_together(data):
+    """Question 5: Which products are most often sold together?"""
+    orders = data.columns(['Order ID', 'Product'])
+    baskets = Baskets.from_orders(orders['Order ID'], orders['Product'])
+    products_pairs = baskets.pairs()
+    orders_frequency = products_pairs['Count'].set_axis(products_pairs['Product A'] + ', ' + products_pairs['Product B'])
+    return {
+        'products_pairs': products_pairs,
+        'orders_frequency': orders_frequency,
+        'most_sold_together': tuple(products_pairs.loc[0, ['Product A', 'Product B']]) if len(products_pairs) else None,
+    }
+
+
+def best_hour(data):
+    """Question 6: Which time of the day should we display advertisements?"""
+    purchases_per_hour = cube.rollup(data.cube, 'Hour', ['Quantity Ordered'])['Quantity Ordered']
+    return {'purchases_per_hour': purchases_per_hour, 'best_hour': HOUR_LABELS[purchases_per_hour.idxmax()]}
+
+
+#the questions by number
+QUESTIONS = {
+    1: best_month,
+    2: best_city,
+    3: top_products,
+    4: price_vs_quantity,
+    5: sold_together,
+    6: best_hour,
+}
+
+
+def run_questions(data, numbers=tuple(QUESTIONS), cache=None):
+    """Answer the questions ``numbers`` (1-6) and return their results by number.
+
+    With a ``cache`` (a :class:`~sales_analysis.cache.ResultCache`), results
+    already computed for the same ingested data are reused, and new ones are
+    stored in it.
+    """
+    fingerprint = data.fingerprint() if cache is not None else None
+    results = {}
+    for number in numbers:
+        question = QUESTIONS[number]
+        with stage('question.{}'.format(question.__name__)):
+            if fingerprint is None:
+                results[number] = question(data)
+                continue
+            results[number] = cache.get(fingerprint, question.__name__)
+            if results[number] is None:
+                results[number] = question(data)
+                cache.put(fingerprint, question.__name__, results[number])
+    return results
@@ -0,0 +1,154 @@
+"""Headless, parallel rendering of the charts straight to image files.
+
+Charts are drawn on standalone figures (outside pyplot, so the backend used
+for showing charts is left alone) in worker processes, so nothing blocks and
+many charts are rendered at once. Each
+worker keeps one figure per kind of chart as a template: the variants of a
+chart (e.g. the monthly sales of every city) only update the bar heights or
+line data and the title of the template before saving it, instead of building
+a new figure every time.
+"""
+
+import pathlib
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from sales_analysis import cube, plots
+from sales_analysis.loader import default_workers
+
+
+#the kinds of chart, with the function drawing them and the title of the template
+CHART_KINDS = {
+    'sales_per_month': (plots.plot_sales_per_month, 'Sales Amount Per Month'),
+    'sales_per_city': (plots.plot_sales_per_city, 'Sales Amount Per City'),
+    'price_vs_quantity': (lambda data, headless: plots.plot_price_vs_quantity(*data, headless=headless),
+                          'The Relationship Between Product Price and Quantity Sold'),
+    'purchases_per_hour': (plots.plot_purchases_per_hour, 'Quantities Sold Per Hour'),
+}
+
+#the templates of the current (worker) process, by kind of chart
+_templates = {}
+
+
+def chart_job(kind, data, path, subtitle=None):
+    """Describe one chart of ``kind`` to draw from ``data`` into the file ``path``."""
+    if kind not in CHART_KINDS:
+        raise ValueError('Unknown kind of chart: {!r}'.format(kind))
+    return {'kind': kind, 'data': data, 'path': str(path), 'subtitle': subtitle}
+
+
+def _labels(kind, data):
+    if kind == 'price_vs_quantity':
+        return tuple(data[0].index)
+    return tuple(data.index)
+
+
+def _update(template, kind, data):
+    #swapping the data of a template figure for the data of another variant of the chart
+    axes = template.axes
+    if kind == 'price_vs_quantity':
+        quantity, prices = data
+        axes[0].lines[0].set_ydata(quantity.to_numpy())
+        axes[1].lines[0].set_ydata(prices.reindex(quantity.index).to_numpy())
+    else:
+        values = data['Sales'] if kind == 'sales_per_month' else data
+        for bar, value in zip(axes[0].patches, values.to_numpy()):
+            bar.set_height(value)
+    for ax in axes:
+        ax.relim()
+        ax.autoscale_view()
+
+
+def render_job(job):
+    """Draw the chart ``job`` (see :func:`chart_job`) and save it; returns its path."""
+    draw, title = CHART_KINDS[job['kind']]
+    labels = _labels(job['kind'], job['data'])
+    template = _templates.get(job['kind'])
+    if template is None or template[1] != labels:
+        #a new template is only needed for a kind of chart with different labels
+        template = _templates[job['kind']] = (draw(job['data'], headless=True), labels)
+    else:
+        _update(template[0], job['kind'], job['data'])
+
+    fig = template[0]
+    fig.axes[0].set_title(title if not job['subtitle'] else '{} - {}'.format(title, job['subtitle']))
+    path = pathlib.Path(job['path'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(path)
+    return str(path)
+
+
+def _render_batch(jobs):
+    return [render_job(job) for job in jobs]
+
+
+def render_charts(jobs, workers=None):
+    """Render every chart of ``jobs`` in ``workers`` processes and return the file paths.
+
+    The jobs are grouped by kind of chart, so each worker can reuse its
+    template figures. With a single worker the charts are rendered in this
+    process.
+    """
+    jobs = sorted(jobs, key=lambda job: job['kind'])
+    workers = default_workers() if workers is None else workers
+    if workers <= 1 or len(jobs) <= 1:
+        return _render_batch(jobs)
+
+    #one contiguous batch of jobs per worker (keeping charts of the same kind together)
+    size = -(-len(jobs) // workers)
+    batches = [jobs[start:start + size] for start in range(0, len(jobs), size)]
+    with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+        return [path for paths in pool.map(_render_batch, batches) for path in paths]
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(text)).strip('_')
+
+
+def question_jobs(results, out_dir, fmt='png'):
+    """Return the chart jobs of the answered questions ``results`` (by number)."""
+    out_dir = pathlib.Path(out_dir)
+    jobs = []
+    if 1 in results:
+        jobs.append(chart_job('sales_per_month', results[1]['sales_per_month'], out_dir / 'sales_per_month.{}'.format(fmt)))
+    if 2 in results:
+        jobs.append(chart_job('sales_per_city', results[2]['sales_per_city'], out_dir / 'sales_per_city.{}'.format(fmt)))
+    if 4 in results:
+        jobs.append(chart_job('price_vs_quantity', (results[4]['products_quantity'], results[4]['products_prices']),
+                              out_dir / 'price_vs_quantity.{}'.format(fmt)))
+    if 6 in results:
+        jobs.append(chart_job('purchases_per_hour', results[6]['purchases_per_hour'],
+                              out_dir / 'purchases_per_hour.{}'.format(fmt)))
+    return jobs
+
+
+def sliced_jobs(sales_cube, by, out_dir, kinds=('sales_per_month', 'purchases_per_hour'), fmt='png'):
+    """Return chart jobs of ``kinds`` for every value of the dimension ``by`` (e.g. each city).
+
+    Every slice is rolled up from ``sales_cube`` and filled in to the same
+    months, hours, cities or products, so all the variants of a chart share
+    one template.
+    """
+    out_dir = pathlib.Path(out_dir)
+    full_index = {
+        'sales_per_month': pd.Index(range(1, 13), name='Month'),
+        'purchases_per_hour': pd.Index(range(24), name='Hour'),
+        'sales_per_city': pd.Index(sorted(sales_cube['City'].unique().astype(str)), name='City'),
+    }
+    jobs = []
+    for value, part in sales_cube.groupby(by, observed=True):
+        for kind in kinds:
+            if kind == 'sales_per_month':
+                data = cube.rollup(part, 'Month', ['Quantity Ordered', 'Sales']).reindex(full_index[kind], fill_value=0)
+            elif kind == 'purchases_per_hour':
+                data = cube.rollup(part, 'Hour', ['Quantity Ordered'])['Quantity Ordered'].reindex(full_index[kind], fill_value=0)
+            elif kind == 'sales_per_city':
+                data = cube.rollup(part, 'City', ['Sales'])['Sales']
+                data = data.set_axis(data.index.astype(str)).reindex(full_index[kind], fill_value=0)
+            else:
+                raise ValueError('Charts of {!r} can not be sliced'.format(kind))
+            path = out_dir / kind / '{}-{}.{}'.format(_slug(by), _slug(value), fmt)
+            jobs.append(chart_job(kind, data, path, subtitle='{}: {}'.format(by, value)))
+    return jobs
@@ -0,0 +1,20 @@
+"""Schema-driven reading of the monthly csv files.
+
+Every column is read straight into its final, compact type: 'Order ID' and
+'Quantity Ordered' as int32, 'Price Each' as float32, 'Order Date' as a
+datetime and 'Product' (plus a derived 'City' column) as categoricals. The
+rows are read and checked in one pass by :mod:`sales_analysis.validate`.
+"""
+
+from sales_analysis.validate import read_validated
+
+
+def read_sales(path):
+    """Read and clean one monthly csv file straight into compact types.
+
+    Returns the valid rows of the file, with a categorical 'City' column. The
+    rows are checked as the ingest checks them (see
+    :mod:`sales_analysis.validate`), so every reader keeps the same rows; the
+    rejected rows are left out.
+    """
+    return read_validated(path)[0]
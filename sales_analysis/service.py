@@ -0,0 +1,149 @@
+"""Service mode: watch the data folder, ingest new files and serve the latest results.
+
+``python -m sales_analysis DATA_DIR --watch`` runs an asyncio event loop that
+polls the data folder every few seconds. Once a new or changed csv file has
+stopped growing (the same size and modification time on two polls in a row),
+it is ingested in a background thread (see :mod:`sales_analysis.ingest`),
+which refreshes the stored cube, and the questions that only need the cube
+(best month, city totals, top products and hourly purchases) are answered
+again. The latest results are written to ``latest.json`` in the store folder
+and, with a ``port``, served over HTTP on the local machine:
+
+- ``/results``: the results of all the watched questions
+- ``/results/<number>``: the results of one question
+- ``/health``: when the results were last updated, and from how many files
+
+The responses are encoded once per update, so requests are answered straight
+from memory.
+"""
+
+import asyncio
+import datetime
+import json
+import pathlib
+import sys
+
+from sales_analysis import storage
+from sales_analysis.cache import ResultCache
+from sales_analysis.cli import results_to_json
+from sales_analysis.ingest import ingest
+from sales_analysis.questions import SalesData, run_questions
+
+
+#the questions answered from the aggregate cube, which are cheap to refresh
+WATCHED_QUESTIONS = (1, 2, 3, 6)
+LATEST_NAME = 'latest.json'
+
+
+class SalesService:
+    """Keep the results of ``questions`` up to date with the csv files in ``data_dir``."""
+
+    def __init__(self, data_dir, store_dir=storage.STORE_DIR, pattern='*.csv', interval=5.0,
+                 workers=None, questions=WATCHED_QUESTIONS):
+        self.data_dir = pathlib.Path(data_dir)
+        self.store_dir = pathlib.Path(store_dir)
+        self.pattern = pattern
+        self.interval = interval
+        self.workers = workers
+        self.questions = tuple(questions)
+        self.version = 0
+        self.responses = {'/health': _encode({'version': 0, 'updated': None, 'files': 0})}
+        self._ingested = None
+
+    def snapshot(self):
+        """Return the size and modification time of every csv file in the data folder."""
+        snapshot = {}
+        for path in self.data_dir.rglob(self.pattern):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[str(path)] = (stat.st_size, stat.st_mtime)
+        return snapshot
+
+    def _update(self):
+        #ingesting the new or changed files and answering the questions from the refreshed cube
+        report = ingest(self.data_dir, self.store_dir, pattern=self.pattern, workers=self.workers)
+        results = run_questions(SalesData(self.store_dir), self.questions, cache=ResultCache.for_store(self.store_dir))
+        return report, results
+
+    async def refresh(self):
+        """Ingest the new or changed files in the background and publish the new results."""
+        report, results = await asyncio.to_thread(self._update)
+        self.publish(report, results)
+        return report
+
+    def publish(self, report, results):
+        """Make ``results`` the latest results (in memory and in ``latest.json``)."""
+        self.version += 1
+        answers = results_to_json(results)
+        health = {'version': self.version, 'updated': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                  'files': len(report['added']) + len(report['changed']) + len(report['unchanged']),
+                  'changes': {key: [pathlib.Path(path).name for path in paths]
+                              for key, paths in report.items() if key != 'unchanged'}}
+        latest = dict(health, results=answers)
+
+        responses = {'/health': _encode(health), '/results': _encode(latest)}
+        responses.update({'/results/{}'.format(number): _encode(answer) for number, answer in answers.items()})
+        self.responses = responses
+
+        path = self.store_dir / LATEST_NAME
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_bytes(responses['/results'])
+        tmp_path.replace(path)
+
+    async def watch(self):
+        """Poll the data folder and refresh the results whenever files settle after a change."""
+        previous = None
+        while True:
+            snapshot = await asyncio.to_thread(self.snapshot)
+            #(a file that is still being written changes between polls, so it is left for the next one)
+            if snapshot != self._ingested and (snapshot == previous or self._ingested is None):
+                try:
+                    report = await self.refresh()
+                except Exception as error:
+                    print('Ingest failed, keeping the previous results: {!r}'.format(error), file=sys.stderr)
+                else:
+                    self._ingested = snapshot
+                    changes = {key: len(paths) for key, paths in report.items() if paths and key != 'unchanged'}
+                    print('Results updated (version {}): {}'.format(self.version, changes or 'no changes'), file=sys.stderr)
+            previous = snapshot
+            await asyncio.sleep(self.interval)
+
+    async def handle(self, reader, writer):
+        """Answer one HTTP request with the latest results."""
+        try:
+            request = await reader.readline()
+            #skipping the request headers
+            while (await reader.readline()).strip():
+                pass
+            method, target, *_ = request.decode('latin-1').split() or ['', '']
+            body = self.responses.get(target.rstrip('/') or '/results')
+            if method not in ('GET', 'HEAD'):
+                status, body = '405 Method Not Allowed', _encode({'error': 'only GET is supported'})
+            elif body is None:
+                status, body = '404 Not Found', _encode({'error': 'no results at {}'.format(target)})
+            else:
+                status = '200 OK'
+            head = ('HTTP/1.1 {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+                    'Connection: close\r\n\r\n').format(status, len(body))
+            writer.write(head.encode('latin-1') + (body if method != 'HEAD' else b''))
+            await writer.drain()
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=None):
+        """Watch the data folder and, with a ``port``, serve the latest results over HTTP."""
+        if port is None:
+            await self.watch()
+            return
+        server = await asyncio.start_server(self.handle, host, port)
+        print('Serving the latest results on http://{}:{}/results'.format(host, port), file=sys.stderr)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.watch())
+
+
+def _encode(data):
+    return json.dumps(data, indent=2).encode()
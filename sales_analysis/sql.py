@@ -0,0 +1,207 @@
+"""An embedded SQL (DuckDB) backend for the six questions.
+
+The monthly csv files (or the Parquet parts of an ingested store) are
+registered as a ``sales`` view in DuckDB, which keeps the rows that pass the
+checks of :mod:`sales_analysis.validate` and converts the types itself, and
+every question is a SQL query. DuckDB runs the queries multi-threaded and out of core, without
+loading the data into pandas first. The results have the same form and
+values as those of :mod:`sales_analysis.questions` (up to floating-point
+summation order), so either backend can be used for any workload.
+"""
+
+import pathlib
+
+import duckdb
+import pandas as pd
+
+from sales_analysis import pricing, storage
+from sales_analysis.dates import DATE_FORMAT, HOUR_LABELS, MONTH_NAMES
+from sales_analysis.ingest import PARTS_DIR, load_manifest
+from sales_analysis.validate import ADDRESS_PATTERN, ORDER_ID_PATTERN, PRICE_PATTERN, QUANTITY_PATTERN
+
+
+#the cleaned sales data from the raw csv files: every column is read as text and the rows
+# are checked as in sales_analysis.validate (the same patterns, quantities and prices above zero;
+# the rows without one field per column are skipped, as the bad_field_count rows)
+CSV_VIEW = """
+CREATE OR REPLACE VIEW sales AS
+SELECT TRY_CAST("Order ID" AS INTEGER) AS order_id,
+       "Product" AS product,
+       TRY_CAST("Quantity Ordered" AS INTEGER) AS quantity,
+       TRY_CAST("Price Each" AS FLOAT) AS price,
+       TRY_STRPTIME("Order Date", '{date_format}') AS order_date,
+       "Purchase Address" AS address
+FROM (
+    SELECT * FROM read_csv({files}, header = true, all_varchar = true, delim = ',', quote = '"',
+                           ignore_errors = true)
+    WHERE regexp_full_match("Order ID", '{order_id}') AND "Product" IS NOT NULL
+      AND regexp_full_match("Quantity Ordered", '{quantity}') AND TRY_CAST("Quantity Ordered" AS BIGINT) > 0
+      AND regexp_full_match("Price Each", '{price}') AND TRY_CAST("Price Each" AS DOUBLE) > 0
+      AND TRY_STRPTIME("Order Date", '{date_format}') IS NOT NULL
+      AND regexp_full_match("Purchase Address", '{address}')
+)
+"""
+
+#the cleaned sales data from the Parquet parts of an ingested store
+STORE_VIEW = """
+CREATE OR REPLACE VIEW sales AS
+SELECT "Order ID" AS order_id, CAST("Product" AS VARCHAR) AS product,
+       "Quantity Ordered" AS quantity, "Price Each" AS price,
+       "Order Date" AS order_date, "Purchase Address" AS address
+FROM read_parquet({files})
+"""
+
+#the columns derived for the questions, as in sales_analysis.cube
+FACTS_VIEW = """
+CREATE OR REPLACE VIEW facts AS
+SELECT order_id, product,
+       CAST(quantity AS BIGINT) AS quantity,
+       quantity * CAST(price AS DOUBLE) AS sales,
+       month(order_date) AS month,
+       hour(order_date) AS hour,
+       split_part(address, ', ', 2) || ' (' || left(split_part(address, ', ', 3), 2) || ')' AS city
+FROM sales
+"""
+
+QUERIES = {
+    'sales_per_month': """
+        SELECT month AS "Month", CAST(sum(quantity) AS BIGINT) AS "Quantity Ordered", sum(sales) AS "Sales"
+        FROM facts GROUP BY month ORDER BY month""",
+    'sales_per_city': """
+        SELECT city AS "City", sum(sales) AS "Sales" FROM facts GROUP BY city ORDER BY city""",
+    'per_product': """
+        SELECT product AS "Product", CAST(sum(quantity) AS BIGINT) AS "Quantity Ordered", sum(sales) AS "Sales"
+        FROM facts GROUP BY product ORDER BY product""",
+    'purchases_per_hour': """
+        SELECT hour AS "Hour", CAST(sum(quantity) AS BIGINT) AS "Quantity Ordered" FROM facts GROUP BY hour ORDER BY hour""",
+    #pairs of products in the same order (each order counted once per pair), with the
+    # number of orders containing each product and the total number of orders
+    'products_pairs': """
+        WITH order_products AS (SELECT DISTINCT order_id, product FROM facts),
+             item_counts AS (SELECT product, count(*) AS n FROM order_products GROUP BY product),
+             n_orders AS (SELECT count(DISTINCT order_id) AS n FROM order_products),
+             pairs AS (
+                 SELECT a.product AS product_a, b.product AS product_b, count(*) AS n
+                 FROM order_products a JOIN order_products b
+                   ON a.order_id = b.order_id AND a.product < b.product
+                 GROUP BY a.product, b.product)
+        SELECT pairs.product_a AS "Product A", pairs.product_b AS "Product B",
+               pairs.n AS "Count",
+               pairs.n / n_orders.n AS "Support",
+               pairs.n / ca.n AS "Confidence A->B",
+               pairs.n / cb.n AS "Confidence B->A",
+               pairs.n * n_orders.n / (ca.n * CAST(cb.n AS DOUBLE)) AS "Lift"
+        FROM pairs, n_orders,
+             item_counts ca, item_counts cb
+        WHERE ca.product = pairs.product_a AND cb.product = pairs.product_b
+        ORDER BY "Count" DESC, "Product A", "Product B\"""",
+}
+
+
+class SqlBackend:
+    """The six questions answered by SQL queries in an embedded DuckDB database.
+
+    Use :meth:`from_csv` for a folder of monthly csv files or
+    :meth:`from_store` for an ingested store.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        connection.execute(FACTS_VIEW)
+
+    @classmethod
+    def from_csv(cls, data_dir, pattern='*.csv', threads=None):
+        """Query the csv files under ``data_dir`` directly."""
+        files = sorted(str(path) for path in pathlib.Path(data_dir).rglob(pattern))
+        if not files:
+            raise FileNotFoundError('No files matching {!r} in {}'.format(pattern, data_dir))
+        connection = cls._connect(threads)
+        connection.execute(CSV_VIEW.format(files=_sql_list(files), date_format=DATE_FORMAT,
+                                           order_id=ORDER_ID_PATTERN, quantity=QUANTITY_PATTERN,
+                                           price=PRICE_PATTERN, address=ADDRESS_PATTERN))
+        return cls(connection)
+
+    @classmethod
+    def from_store(cls, store_dir=storage.STORE_DIR, threads=None):
+        """Query the cleaned Parquet parts of the store ``store_dir``.
+
+        Only the parts listed in the ingest manifest are read, as
+        :func:`sales_analysis.ingest.load_ingested` does (an interrupted
+        ingest can leave other parts in the folder).
+        """
+        parts_dir = pathlib.Path(store_dir) / PARTS_DIR
+        files = [str(storage.frame_path(entry['part'], parts_dir))
+                 for _, entry in sorted(load_manifest(store_dir)['files'].items())]
+        if not files:
+            raise FileNotFoundError('Nothing has been ingested into {} yet'.format(store_dir))
+        connection = cls._connect(threads)
+        connection.execute(STORE_VIEW.format(files=_sql_list(files)))
+        return cls(connection)
+
+    @staticmethod
+    def _connect(threads):
+        connection = duckdb.connect()
+        if threads:
+            connection.execute('SET threads TO {:d}'.format(threads))
+        return connection
+
+    def query(self, name):
+        """Run the named query of :data:`QUERIES` and return the result as a dataframe."""
+        return self.connection.execute(QUERIES[name]).df()
+
+    def best_month(self):
+        sales_per_month = _indexed(self.query('sales_per_month'), 'Month', 'int8')
+        month = sales_per_month['Sales'].idxmax()
+        return {
+            'sales_per_month': sales_per_month,
+            'best_month': MONTH_NAMES[month],
+            'best_month_sales': float(sales_per_month.loc[month, 'Sales']),
+        }
+
+    def best_city(self):
+        sales_per_city = _indexed(self.query('sales_per_city'), 'City', 'category')['Sales']
+        return {'sales_per_city': sales_per_city, 'best_city': sales_per_city.idxmax()}
+
+    def top_products(self):
+        products_sold = _indexed(self.query('per_product'), 'Product', 'category')['Quantity Ordered']
+        products_sold = products_sold.sort_values(ascending=False)
+        return {'products_sold': products_sold, 'most_sold_product': products_sold.index[0]}
+
+    def price_vs_quantity(self):
+        per_product = _indexed(self.query('per_product'), 'Product', 'category')
+        products_prices = (per_product['Sales'] / per_product['Quantity Ordered']).round(2)
+        return {
+            'products_quantity': per_product['Quantity Ordered'],
+            'products_prices': products_prices,
+            **pricing.price_quantity_relationship(per_product['Quantity Ordered'], products_prices),
+        }
+
+    def sold_together(self):
+        products_pairs = self.query('products_pairs')
+        orders_frequency = products_pairs['Count'].set_axis(products_pairs['Product A'] + ', ' + products_pairs['Product B'])
+        return {
+            'products_pairs': products_pairs,
+            'orders_frequency': orders_frequency,
+            'most_sold_together': tuple(products_pairs.loc[0, ['Product A', 'Product B']]) if len(products_pairs) else None,
+        }
+
+    def best_hour(self):
+        purchases_per_hour = _indexed(self.query('purchases_per_hour'), 'Hour', 'int8')['Quantity Ordered']
+        return {'purchases_per_hour': purchases_per_hour, 'best_hour': HOUR_LABELS[purchases_per_hour.idxmax()]}
+
+    def run_questions(self, numbers=range(1, 7)):
+        """Answer the questions ``numbers`` (1-6) and return their results by number."""
+        methods = {1: self.best_month, 2: self.best_city, 3: self.top_products,
+                   4: self.price_vs_quantity, 5: self.sold_together, 6: self.best_hour}
+        return {number: methods[number]() for number in numbers}
+
+
+def _indexed(frame, col, dtype):
+    #indexing the query result by ``col`` with the index type of the pandas backend
+    #(int8 months and hours, categorical cities and products)
+    return frame.drop(columns=col).set_axis(pd.Index(frame[col].astype(dtype), name=col))
+
+
+def _sql_list(values):
+    #a list of string literals
+    return '[{}]'.format(', '.join("'{}'".format(value.replace("'", "''")) for value in values))
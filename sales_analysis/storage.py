@@ -0,0 +1,52 @@
+"""Typed columnar storage for the merged and cleaned sales data.
+
+The frames are kept as Parquet files (through pyarrow), which store the
+categorical, int32 and float32 columns as they are, so reloading a frame is
+near-instant and doesn't turn numbers back into text the way an Excel
+round-trip does. Excel is only written as an optional final export.
+"""
+
+import pathlib
+
+import pandas as pd
+
+
+#default folder for the stored frames (relative to the current working directory)
+STORE_DIR = 'Sales Store'
+
+
+def frame_path(name, store_dir=STORE_DIR):
+    """Return the path of the stored frame called ``name``."""
+    return pathlib.Path(store_dir) / '{}.parquet'.format(name)
+
+
+def save_frame(df, name, store_dir=STORE_DIR):
+    """Store ``df`` under ``name`` in ``store_dir`` and return the file path.
+
+    The index is dropped, as in the original Excel file; the dtypes of the
+    columns (including categoricals) are preserved.
+    """
+    path = frame_path(name, store_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    #writing to a temporary file first so a crash never leaves a half-written store behind
+    tmp_path = path.with_suffix('.parquet.tmp')
+    df.reset_index(drop=True).to_parquet(tmp_path, engine='pyarrow', index=False)
+    tmp_path.replace(path)
+    return path
+
+
+def load_frame(name, store_dir=STORE_DIR, columns=None):
+    """Load the frame stored under ``name``, optionally only some ``columns``."""
+    path = frame_path(name, store_dir)
+    if not path.exists():
+        raise FileNotFoundError('No stored frame named {!r} in {}'.format(name, store_dir))
+    return pd.read_parquet(path, engine='pyarrow', columns=columns)
+
+
+def export_excel(df, path='All Sales.xlsx', sheet_name='Sales 2019'):
+    """Write ``df`` to an Excel file (a final export only, never read back)."""
+    df.to_excel(path,                   #specifying the file name
+                sheet_name=sheet_name,  #specifying the sheet name
+                index=False)            #removing unnecessary index column
+    return pathlib.Path(path)
@@ -0,0 +1,129 @@
+"""Chunked (streaming) aggregation for datasets larger than memory.
+
+Instead of loading every order into one dataframe, the csv files are read in
+chunks of a bounded size; each chunk is cleaned, reduced to small partial
+aggregates (per month, city, product and hour), and merged into the running
+totals. Peak memory therefore depends on the chunk size, not on the size of
+the dataset.
+"""
+
+import pathlib
+
+import pandas as pd
+
+from sales_analysis.dates import hour_column, month_column
+from sales_analysis.geo import city_column
+from sales_analysis.validate import iter_raw, validate_table
+
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _add(total, partial):
+    #merging a partial sum into the running total
+    if total is None:
+        return partial
+    return total.add(partial, fill_value=0)
+
+
+class RunningAggregates:
+    """Running totals for Questions 1, 2, 3, 4 and 6.
+
+    Feed cleaned chunks of sales data to :meth:`update` and read the merged
+    results with :meth:`results`.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.per_month = None
+        self.per_city = None
+        self.per_product = None
+        self.per_hour = None
+        self.price_min = None
+        self.price_max = None
+
+    def update(self, df):
+        """Add the cleaned chunk ``df`` to the running totals."""
+        if df.empty:
+            return
+        self.rows += len(df)
+        dates = df['Order Date']
+        chunk = pd.DataFrame({
+            'Month': month_column(dates),
+            'Hour': hour_column(dates),
+            'City': city_column(df['Purchase Address']),
+            'Product': df['Product'],
+            'Quantity Ordered': df['Quantity Ordered'].astype('int64'),
+            'Sales': df['Quantity Ordered'] * df['Price Each'].astype('float64'),
+            'Price Each': df['Price Each'].astype('float64'),
+            'Orders': 1,
+        })
+
+        self.per_month = _add(self.per_month, chunk.groupby('Month')[['Quantity Ordered', 'Sales']].sum())
+        self.per_city = _add(self.per_city, chunk.groupby('City')[['Quantity Ordered', 'Sales']].sum())
+        self.per_hour = _add(self.per_hour, chunk.groupby('Hour')[['Quantity Ordered', 'Sales', 'Orders']].sum())
+
+        by_product = chunk.groupby('Product')
+        self.per_product = _add(self.per_product, by_product[['Quantity Ordered', 'Sales', 'Price Each', 'Orders']].sum())
+        self.price_min = self._merge_extreme(self.price_min, by_product['Price Each'].min(), min)
+        self.price_max = self._merge_extreme(self.price_max, by_product['Price Each'].max(), max)
+
+    @staticmethod
+    def _merge_extreme(total, partial, how):
+        if total is None:
+            return partial
+        combined = pd.concat([total, partial], axis=1)
+        return combined.min(axis=1) if how is min else combined.max(axis=1)
+
+    def results(self):
+        """Return the merged aggregates as a dict of pandas objects.
+
+        The keys are 'sales_per_month' (by month number), 'sales_per_city',
+        'products_sold' (sorted by quantity, descending), 'products_prices'
+        (mean, min and max price per product) and 'purchases_per_hour' (total
+        quantity ordered by hour of the day).
+        """
+        if self.rows == 0:
+            raise ValueError('No sales data has been aggregated')
+        #merging with fill values turns the counts into floats, so they are converted back
+        counts = {'Quantity Ordered': 'int64', 'Orders': 'int64'}
+        per_month = self.per_month.astype({'Quantity Ordered': 'int64'})
+        per_product = self.per_product.astype(counts)
+        per_hour = self.per_hour.astype(counts)
+
+        #prices are stored as float32, so they are rounded back to cents
+        products_prices = pd.DataFrame({
+            'Mean Price': per_product['Price Each'] / per_product['Orders'],
+            'Min Price': self.price_min,
+            'Max Price': self.price_max,
+        }).round(2)
+        return {
+            'sales_per_month': per_month.sort_index(),
+            'sales_per_city': self.per_city['Sales'].sort_index(),
+            'products_sold': per_product['Quantity Ordered'].sort_values(ascending=False),
+            'products_prices': products_prices.sort_index(),
+            'purchases_per_hour': per_hour['Quantity Ordered'].sort_index(),
+        }
+
+
+def iter_clean_chunks(paths, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield cleaned chunks of at most ``chunksize`` rows from the csv ``paths``.
+
+    The rows are checked as the ingest checks them (see
+    :func:`sales_analysis.validate.validate_table`); the rejected ones are left out.
+    """
+    for path in paths:
+        for table in iter_raw(path, chunksize):
+            yield validate_table(table)[0]
+
+
+def stream_aggregates(data_dir, chunksize=DEFAULT_CHUNKSIZE, pattern='*.csv'):
+    """Aggregate all the csv files under ``data_dir`` chunk by chunk.
+
+    Returns the same dict as :meth:`RunningAggregates.results`.
+    """
+    paths = sorted(pathlib.Path(data_dir).rglob(pattern))
+    totals = RunningAggregates()
+    for chunk in iter_clean_chunks(paths, chunksize):
+        totals.update(chunk)
+    return totals.results()
@@ -0,0 +1,122 @@
+"""Sales over time: daily, weekly and monthly revenue, rolling windows and growth.
+
+Question 1 groups the sales by month number only, which merges the same month
+of different years. Here the sales are kept per calendar day (a few hundred
+rows a year), and the weekly and monthly series are built from those, keyed on
+the actual week or year-month ('2019-01', '2020-01', ...). New orders are
+added to the daily sales with :meth:`SalesTimeSeries.update`, without going
+over the earlier orders again; the store keeps the daily sales of every
+ingested file, and of the whole store, up to date the same way (see
+:mod:`sales_analysis.ingest`).
+"""
+
+import pandas as pd
+
+from sales_analysis import storage
+from sales_analysis.instrument import stage
+
+
+DAILY_NAME = 'Daily Sales'
+MEASURES = ['Quantity Ordered', 'Sales', 'Orders']
+
+#the supported periods: days, weeks (ending on Sunday) and calendar months
+FREQUENCIES = {'D': 'D', 'W': 'W-SUN', 'M': 'M'}
+
+
+def daily_sales(df):
+    """Return the quantity ordered, sales amount and order lines of ``df`` per day.
+
+    The result is indexed by day ('Day') and only has the days with orders.
+    """
+    with stage('timeseries.daily_sales', len(df)) as record:
+        frame = pd.DataFrame({
+            'Day': df['Order Date'].dt.normalize(),
+            'Quantity Ordered': df['Quantity Ordered'].astype('int64'),
+            'Sales': df['Quantity Ordered'] * df['Price Each'].astype('float64'),
+            'Orders': 1,
+        })
+        daily = frame.groupby('Day', sort=True)[MEASURES].sum().astype({'Orders': 'int64'})
+        record['rows_out'] = len(daily)
+    return daily
+
+
+def merge_daily(frames):
+    """Combine the daily sales of several parts of the data (e.g. one per monthly file)."""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame({'Quantity Ordered': [], 'Sales': [], 'Orders': []},
+                            index=pd.DatetimeIndex([], name='Day')).astype({'Quantity Ordered': 'int64', 'Orders': 'int64'})
+    return pd.concat(frames).groupby(level='Day', sort=True).sum()
+
+
+def revenue(daily, freq='M'):
+    """Return the daily sales ``daily`` summed per day ('D'), week ('W') or month ('M').
+
+    The result is indexed by period, with every period from the first to the
+    last one (periods without orders have zero sales).
+    """
+    periods = daily.index.to_period(FREQUENCIES[freq])
+    totals = daily.groupby(periods, sort=True).sum()
+    if len(totals):
+        totals = totals.reindex(pd.period_range(totals.index[0], totals.index[-1], freq=FREQUENCIES[freq]), fill_value=0)
+    return totals.rename_axis('Period')
+
+
+def rolling(daily, window, freq='D', measure='Sales', how='sum'):
+    """Return the rolling sum (or mean, with ``how='mean'``) of ``measure`` over ``window`` periods.
+
+    The first windows are computed over the periods available so far.
+    """
+    return getattr(revenue(daily, freq)[measure].rolling(window, min_periods=1), how)()
+
+
+def growth(daily, freq='M', periods=1, measure='Sales'):
+    """Return the period-over-period growth of ``measure`` (0.1 is 10% more than ``periods`` periods earlier).
+
+    Monthly growth with ``periods=12`` compares every month with the same month of the year before.
+    """
+    return revenue(daily, freq)[measure].pct_change(periods=periods, fill_method=None)
+
+
+def save_daily(daily, name=DAILY_NAME, store_dir=storage.STORE_DIR):
+    """Save the daily sales ``daily`` to the store."""
+    storage.save_frame(daily.reset_index(), name, store_dir)
+
+
+def load_daily(name=DAILY_NAME, store_dir=storage.STORE_DIR):
+    """Load daily sales saved with :func:`save_daily`."""
+    return storage.load_frame(name, store_dir).set_index('Day')
+
+
+class SalesTimeSeries:
+    """Daily sales that are updated as new orders arrive.
+
+    Each call of :meth:`update` only aggregates the new orders and adds them
+    to the daily sales so far; the weekly and monthly revenue, rolling
+    windows and growth are derived from those on demand.
+    """
+
+    def __init__(self, daily=None):
+        self.daily = merge_daily([] if daily is None else [daily])
+
+    @classmethod
+    def load(cls, store_dir=storage.STORE_DIR):
+        """Start from the daily sales of the store ``store_dir``."""
+        return cls(load_daily(store_dir=store_dir))
+
+    def update(self, df):
+        """Add the cleaned sales data ``df`` (new orders only) to the daily sales."""
+        self.daily = merge_daily([self.daily, daily_sales(df)])
+        return self
+
+    def revenue(self, freq='M'):
+        return revenue(self.daily, freq)
+
+    def rolling(self, window, freq='D', measure='Sales', how='sum'):
+        return rolling(self.daily, window, freq, measure, how)
+
+    def growth(self, freq='M', periods=1, measure='Sales'):
+        return growth(self.daily, freq, periods, measure)
+
+    def save(self, store_dir=storage.STORE_DIR):
+        save_daily(self.daily, store_dir=store_dir)
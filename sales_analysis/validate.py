@@ -0,0 +1,173 @@
+"""One-pass validation of the monthly csv files, with a quarantine for bad rows.
+
+Every column is read as text with pyarrow and checked once, all columns
+together: each row gets the reason code of the first check it fails (or none),
+and a single filter splits the rows into the good ones, converted to compact
+types (int32 ids and quantities, float32 prices and categorical products and
+cities), and the bad ones, kept as they were read with their reason, file and
+row number. Nothing is dropped silently:
+the ingest keeps the bad rows of every file in a quarantine next to the store
+(see :mod:`sales_analysis.ingest`).
+"""
+
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+
+from sales_analysis.dates import DATE_FORMAT
+from sales_analysis.geo import city_column
+from sales_analysis.instrument import stage
+
+
+COLUMNS = ['Order ID', 'Product', 'Quantity Ordered', 'Price Each', 'Order Date', 'Purchase Address']
+
+#the reason codes of the bad rows, in the order the checks are made
+REASONS = [
+    'bad_field_count',      #not one field per column (e.g. an unquoted address, or a cut-off line)
+    'empty_row',            #every field is empty (the ",,,,," rows)
+    'repeated_header',      #a copy of the header line
+    'bad_order_id',         #not a whole number
+    'missing_product',
+    'bad_quantity',         #not a whole number above zero
+    'bad_price',            #not a number above zero
+    'bad_date',             #not a month/day/year hour:minute date
+    'bad_address',          #not "street, City, ST 12345"
+]
+
+#the patterns the text of the columns must match (also used by the SQL backend)
+ORDER_ID_PATTERN = r'^\d{1,9}$'
+QUANTITY_PATTERN = r'^\d{1,9}$'
+PRICE_PATTERN = r'^(\d+\.?\d*|\.\d+)$'
+ADDRESS_PATTERN = r'^[^,]+, [^,]+, [A-Z]{2} \d{5}$'
+
+#the typical size of a csv row, to read about ``chunksize`` rows at a time in iter_raw
+ROW_BYTES = 96
+
+
+def _convert_options():
+    return pcsv.ConvertOptions(column_types={col: pa.string() for col in COLUMNS}, include_columns=COLUMNS,
+                               strings_can_be_null=True)
+
+
+def _parse_options(rejected):
+    #the rows without one field per column are skipped by the parser and collected as (row, text)
+    #(their line numbers are only known when the file is parsed in one thread; the header is line 1)
+    def skip(row):
+        rejected.append((row.number - 2, row.text))
+        return 'skip'
+    return pcsv.ParseOptions(invalid_row_handler=skip)
+
+
+def read_raw(path):
+    """Read one monthly csv file with every column as (nullable) text, as an Arrow table.
+
+    Returns ``(table, rejected)``: the rows that don't have one field per
+    column can't be put in the table, so they are returned in ``rejected``
+    as ``(row, text)`` pairs, with their position among the data rows.
+    """
+    rejected = []
+    table = pcsv.read_csv(path, read_options=pcsv.ReadOptions(use_threads=False),
+                          parse_options=_parse_options(rejected), convert_options=_convert_options())
+    return table, rejected
+
+
+def iter_raw(path, chunksize):
+    """Read one monthly csv file as :func:`read_raw` does, yielding tables of at most ``chunksize`` rows.
+
+    The rows that don't have one field per column are left out.
+    """
+    options = pcsv.ReadOptions(block_size=max(chunksize * ROW_BYTES, 1 << 16))
+    with pcsv.open_csv(path, read_options=options, parse_options=_parse_options([]),
+                       convert_options=_convert_options()) as reader:
+        for batch in reader:
+            for start in range(0, batch.num_rows, chunksize):
+                yield pa.Table.from_batches([batch.slice(start, chunksize)])
+
+
+def _valid(mask):
+    #a check fails where its mask is false or null
+    return np.asarray(pc.fill_null(mask, False))
+
+
+def _positive(values, pattern, type):
+    #the values written as numbers (matching ``pattern``) that are above zero
+    numbers = pc.if_else(pc.match_substring_regex(values, pattern), values, pa.scalar(None, pa.string()))
+    return _valid(pc.greater(pc.cast(numbers, type), 0))
+
+
+def validate_table(table, source=None, rejected=()):
+    """Split the raw Arrow ``table`` into good and bad rows.
+
+    ``rejected`` are the rows the parser couldn't split into the columns (see
+    :func:`read_raw`). Returns ``(good, bad)``: ``good`` has the same columns
+    and types as :func:`sales_analysis.schema.read_sales` (including 'City'),
+    ``bad`` the raw text of the bad rows with their 'Reason' (see
+    :data:`REASONS`), 'Source' file and 'Row' (the position among the data
+    rows of the file); the rows that couldn't be split only have their 'Text'.
+    """
+    cols = {col: table[col] for col in COLUMNS}
+    dates = pc.strptime(cols['Order Date'], format=DATE_FORMAT, unit='s', error_is_null=True)
+    present = [_valid(pc.is_valid(cols[col])) for col in COLUMNS]
+    checks = [
+        np.logical_or.reduce(present),
+        _valid(pc.not_equal(cols['Order ID'], 'Order ID')),
+        _valid(pc.match_substring_regex(cols['Order ID'], ORDER_ID_PATTERN)),
+        _valid(pc.is_valid(cols['Product'])),
+        _positive(cols['Quantity Ordered'], QUANTITY_PATTERN, pa.int64()),
+        _positive(cols['Price Each'], PRICE_PATTERN, pa.float64()),
+        _valid(pc.is_valid(dates)),
+        _valid(pc.match_substring_regex(cols['Purchase Address'], ADDRESS_PATTERN)),
+    ]
+
+    #the reason of every row is its first failed check (-1 for good rows; the first
+    # reason, bad_field_count, is found by the parser, so the checks start at the second)
+    reasons = np.full(table.num_rows, -1, dtype=np.int8)
+    for code in reversed(range(len(checks))):
+        reasons[~checks[code]] = code + 1
+    good = reasons == -1
+
+    rows = table.filter(pa.array(good))
+    df = pd.DataFrame({
+        'Order ID': pc.cast(rows['Order ID'], pa.int32()).to_numpy(),
+        'Product': rows['Product'].to_pandas().astype('category'),
+        'Quantity Ordered': pc.cast(rows['Quantity Ordered'], pa.int32()).to_numpy(),
+        #(parsed as float64 first, for the same values as pandas gives)
+        'Price Each': pc.cast(rows['Price Each'], pa.float64()).to_numpy().astype('float32'),
+        'Order Date': pc.cast(dates.filter(pa.array(good)), pa.timestamp('us')).to_pandas(),
+        'Purchase Address': rows['Purchase Address'].to_pandas(),
+    })
+    df['City'] = city_column(df['Purchase Address'])
+
+    #the positions of the rows in the file, counting the rejected ones the table doesn't have
+    positions = np.delete(np.arange(table.num_rows + len(rejected)), [row for row, _ in rejected])
+    bad_rows = np.flatnonzero(~good)
+    bad = pa.concat_tables([
+        table.take(pa.array(bad_rows)).append_column('Text', pa.nulls(len(bad_rows), pa.string())),
+        pa.table(dict({col: pa.nulls(len(rejected), pa.string()) for col in COLUMNS},
+                      Text=pa.array([text for _, text in rejected], pa.string()))),
+    ]).to_pandas()
+    codes = np.concatenate([reasons[bad_rows], np.zeros(len(rejected), dtype=np.int8)])
+    bad.insert(0, 'Reason', pd.Categorical.from_codes(codes, categories=REASONS))
+    bad.insert(1, 'Source', pd.Categorical([source] * len(bad)))
+    bad.insert(2, 'Row', np.concatenate([positions[bad_rows], [row for row, _ in rejected]]).astype('int32'))
+    return df, bad.sort_values('Row', kind='stable', ignore_index=True)
+
+
+def read_validated(path):
+    """Read and validate one monthly csv file; returns ``(good, bad)`` as :func:`validate_table`."""
+    with stage('read.read_raw') as record:
+        table, rejected = read_raw(path)
+        record['rows_out'] = table.num_rows
+    with stage('read.validate', table.num_rows) as record:
+        good, bad = validate_table(table, source=pathlib.Path(path).name, rejected=rejected)
+        record['rows_out'] = len(good)
+    return good, bad
+
+
+def reason_counts(bad):
+    """Return the number of bad rows for every reason code."""
+    return bad['Reason'].value_counts(sort=False)
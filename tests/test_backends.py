@@ -0,0 +1,157 @@
+"""The pandas and SQL backends must give the same results for the same files."""
+
+import math
+
+import pandas as pd
+import pytest
+
+from sales_analysis.cli import results_to_json
+from sales_analysis.questions import SalesData, run_questions
+
+sql = pytest.importorskip('sales_analysis.sql')
+
+
+HEADER = 'Order ID,Product,Quantity Ordered,Price Each,Order Date,Purchase Address\n'
+
+FILES = {
+    'Sales_January_2019.csv': [
+        '141234,iPhone,1,700,01/22/19 21:25,"944 Walnut St, Boston, MA 02215"',
+        '141235,Lightning Charging Cable,1,14.95,01/28/19 14:15,"185 Maple St, Portland, OR 97035"',
+        '141235,iPhone,1,700,01/28/19 14:15,"185 Maple St, Portland, OR 97035"',
+        ',,,,,',
+        '141236,Wired Headphones,2,11.99,01/17/19 13:33,"538 Adams St, San Francisco, CA 94016"',
+        HEADER.strip(),
+        '141237,27in FHD Monitor,1,149.99,01/05/19 20:33,"738 10th St, Los Angeles, CA 90001"',
+    ],
+    'Sales_February_2019.csv': [
+        '150502,iPhone,1,700,02/18/19 01:35,"866 Spruce St, Portland, ME 04101"',
+        '150503,AA Batteries (4-pack),3,3.84,02/13/19 07:24,"18 13th St, San Francisco, CA 94016"',
+        '150504,Wired Headphones,1,11.99,02/18/19 09:46,"52 6th St, New York City, NY 10001"',
+        '150504,Lightning Charging Cable,2,14.95,02/18/19 09:46,"52 6th St, New York City, NY 10001"',
+        '150504,iPhone,1,700,02/18/19 09:46,"52 6th St, New York City, NY 10001"',
+        '150505,Lightning Charging Cable,1,14.95,02/02/19 16:47,"129 Cherry St, Atlanta, GA 30301"',
+        '150505,iPhone,1,700,02/02/19 16:47,"129 Cherry St, Atlanta, GA 30301"',
+    ],
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    folder = tmp_path / 'data'
+    folder.mkdir()
+    for name, lines in FILES.items():
+        (folder / name).write_text(HEADER + '\n'.join(lines) + '\n')
+    return folder
+
+
+def assert_same(expected, actual):
+    assert expected.keys() == actual.keys()
+    for number in expected:
+        assert expected[number].keys() == actual[number].keys()
+        for name, value in expected[number].items():
+            other = actual[number][name]
+            if isinstance(value, pd.Series):
+                pd.testing.assert_series_equal(value, other, check_exact=False, rtol=1e-9)
+            elif isinstance(value, pd.DataFrame):
+                pd.testing.assert_frame_equal(value, other, check_exact=False, rtol=1e-9)
+            elif isinstance(value, float):
+                assert value == pytest.approx(other, rel=1e-9, nan_ok=True) or (math.isnan(value) and math.isnan(other))
+            else:
+                assert value == other, (number, name)
+
+
+def assert_same_json(expected, actual):
+    if isinstance(expected, dict):
+        assert expected.keys() == actual.keys()
+        for key in expected:
+            assert_same_json(expected[key], actual[key])
+    elif isinstance(expected, list):
+        assert len(expected) == len(actual)
+        for item, other in zip(expected, actual):
+            assert_same_json(item, other)
+    elif isinstance(expected, float):
+        assert expected == pytest.approx(other_or_nan(actual), rel=1e-9, nan_ok=True)
+    else:
+        assert expected == actual
+
+
+def other_or_nan(value):
+    return float('nan') if value is None else value
+
+
+def test_sql_backends_match_pandas(data_dir, tmp_path):
+    store = tmp_path / 'store'
+    expected = run_questions(SalesData.from_directory(data_dir, store, workers=1))
+    for backend in (sql.SqlBackend.from_csv(data_dir), sql.SqlBackend.from_store(store)):
+        actual = backend.run_questions()
+        assert_same(expected, actual)
+        assert_same_json(results_to_json(expected), results_to_json(actual))
+
+
+def test_json_keeps_the_month_keys(data_dir, tmp_path):
+    results = sql.SqlBackend.from_csv(data_dir).run_questions([1])
+    assert list(results_to_json(results)['1']['sales_per_month']) == ['1', '2']
+
+
+def test_every_reader_keeps_the_same_rows(tmp_path):
+    from sales_analysis.ingest import load_ingested
+    from sales_analysis.loader import load_sales
+    from sales_analysis.streaming import stream_aggregates
+
+    folder = tmp_path / 'data'
+    folder.mkdir()
+    (folder / 'Sales_March_2019.csv').write_text(HEADER + '\n'.join([
+        '160001,Google Phone,1,600,03/01/19 10:00,"1 Main St, Boston, MA 02215"',
+        '160002,Google Phone,0,600,03/01/19 11:00,"2 Main St, Boston, MA 02215"',
+        '160003,Google Phone,1,600,03/01/19 12:00,somewhere',
+        '160004,Google Phone,1,600,03/01/19 13:00,"4 Main St, Dallas, TX 75001"',
+    ]) + '\n')
+
+    store = tmp_path / 'store'
+    SalesData.from_directory(folder, store, workers=1)
+    sold = {
+        'ingest': load_ingested(store).groupby('Product', observed=True)['Quantity Ordered'].sum(),
+        'pandas': load_sales(folder, workers=1).groupby('Product', observed=True)['Quantity Ordered'].sum(),
+        'stream': stream_aggregates(folder)['products_sold'],
+        'sql': sql.SqlBackend.from_csv(folder).top_products()['products_sold'],
+    }
+    for name, products in sold.items():
+        assert products['Google Phone'] == 2, name
+
+    cities = sql.SqlBackend.from_csv(folder).best_city()['sales_per_city']
+    assert sorted(cities.index) == ['Boston (MA)', 'Dallas (TX)']
+
+
+def test_rows_with_the_wrong_number_of_fields_are_quarantined(tmp_path):
+    from sales_analysis.ingest import load_ingested, load_quarantine
+    from sales_analysis.streaming import stream_aggregates
+
+    folder = tmp_path / 'data'
+    folder.mkdir()
+    (folder / 'Sales_April_2019.csv').write_text(HEADER + '\n'.join([
+        '170001,iPhone,1,700,04/01/19 10:00,"944 Walnut St, Boston, MA 02215"',
+        '170002,iPhone,1,700,04/01/19 11:00,944 Walnut St, Boston, MA 02215',
+        '170003,iPhone,1,700',
+        '170004,Google Phone,1,600,04/01/19 13:00,"4 Main St, Dallas, TX 75001"',
+    ]) + '\n')
+
+    store = tmp_path / 'store'
+    SalesData.from_directory(folder, store, workers=1)
+    assert list(load_ingested(store)['Order ID']) == [170001, 170004]
+    quarantine = load_quarantine(store)
+    assert list(quarantine['Reason']) == ['bad_field_count', 'bad_field_count']
+    assert list(quarantine['Row']) == [1, 2]
+    assert quarantine['Text'].iloc[1] == '170003,iPhone,1,700'
+
+    assert stream_aggregates(folder)['products_sold'].to_dict() == {'iPhone': 1, 'Google Phone': 1}
+    assert sql.SqlBackend.from_csv(folder).top_products()['products_sold'].to_dict() == {'iPhone': 1, 'Google Phone': 1}
+
+
+def test_sql_store_reads_only_the_parts_in_the_manifest(data_dir, tmp_path):
+    store = tmp_path / 'store'
+    expected = run_questions(SalesData.from_directory(data_dir, store, workers=1), [3])
+    #a part left behind by an interrupted ingest
+    part = next((store / 'parts').glob('*.parquet'))
+    part.with_name('orphan-000000000000.parquet').write_bytes(part.read_bytes())
+    actual = sql.SqlBackend.from_store(store).run_questions([3])
+    pd.testing.assert_series_equal(expected[3]['products_sold'], actual[3]['products_sold'])
@@ -0,0 +1,105 @@
+"""The ingest manifest: only new or changed files are read, and parts follow their files."""
+
+import os
+import shutil
+
+import pytest
+
+from sales_analysis.ingest import (CUBES_DIR, DAILY_DIR, PARTS_DIR, QUARANTINE_DIR, ingest, load_ingested,
+                                   load_manifest)
+
+
+HEADER = 'Order ID,Product,Quantity Ordered,Price Each,Order Date,Purchase Address\n'
+
+JANUARY = HEADER + '\n'.join([
+    '141234,iPhone,1,700,01/22/19 21:25,"944 Walnut St, Boston, MA 02215"',
+    ',,,,,',
+    '141235,Wired Headphones,2,11.99,01/28/19 14:15,"185 Maple St, Portland, OR 97035"',
+]) + '\n'
+
+FEBRUARY = HEADER + '\n'.join([
+    '150502,iPhone,1,700,02/18/19 01:35,"866 Spruce St, Portland, ME 04101"',
+]) + '\n'
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    folder = tmp_path / 'data'
+    folder.mkdir()
+    (folder / 'Sales_January_2019.csv').write_text(JANUARY)
+    (folder / 'Sales_February_2019.csv').write_text(FEBRUARY)
+    return folder
+
+
+def counts(report):
+    return {key: len(paths) for key, paths in report.items()}
+
+
+def stored(store, folder=PARTS_DIR):
+    return sorted(path.stem for path in (store / folder).glob('*.parquet'))
+
+
+def parts(store):
+    return sorted(entry['part'] for entry in load_manifest(store)['files'].values())
+
+
+def test_new_files_are_added(data_dir, tmp_path):
+    store = tmp_path / 'store'
+    report = ingest(data_dir, store, workers=1)
+    assert counts(report) == {'added': 2, 'changed': 0, 'removed': 0, 'unchanged': 0}
+    assert stored(store) == stored(store, CUBES_DIR) == stored(store, DAILY_DIR) == parts(store)
+    #(only January has a bad row)
+    assert len(stored(store, QUARANTINE_DIR)) == 1
+    assert sorted(load_ingested(store)['Order ID']) == [141234, 141235, 150502]
+
+
+def test_unchanged_and_touched_files_are_not_read_again(data_dir, tmp_path):
+    store = tmp_path / 'store'
+    ingest(data_dir, store, workers=1)
+    before = parts(store)
+    assert counts(ingest(data_dir, store, workers=1))['unchanged'] == 2
+
+    path = data_dir / 'Sales_January_2019.csv'
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 60))
+    report = ingest(data_dir, store, workers=1)
+    assert counts(report) == {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 2}
+    assert parts(store) == before
+    assert load_manifest(store)['files'][str(path.resolve())]['mtime'] == path.stat().st_mtime
+
+
+def test_changed_files_replace_their_part(data_dir, tmp_path):
+    store = tmp_path / 'store'
+    ingest(data_dir, store, workers=1)
+    before = parts(store)
+
+    (data_dir / 'Sales_February_2019.csv').write_text(
+        FEBRUARY + '150503,Google Phone,1,600,02/13/19 07:24,"18 13th St, San Francisco, CA 94016"\n')
+    report = ingest(data_dir, store, workers=1)
+    assert counts(report) == {'added': 0, 'changed': 1, 'removed': 0, 'unchanged': 1}
+    assert len(set(parts(store)) - set(before)) == 1
+    assert stored(store) == stored(store, CUBES_DIR) == stored(store, DAILY_DIR) == parts(store)
+    assert sorted(load_ingested(store)['Order ID']) == [141234, 141235, 150502, 150503]
+
+
+def test_removed_files_lose_their_part(data_dir, tmp_path):
+    store = tmp_path / 'store'
+    ingest(data_dir, store, workers=1)
+
+    (data_dir / 'Sales_January_2019.csv').unlink()
+    report = ingest(data_dir, store, workers=1)
+    assert counts(report) == {'added': 0, 'changed': 0, 'removed': 1, 'unchanged': 1}
+    assert stored(store) == stored(store, CUBES_DIR) == stored(store, DAILY_DIR) == parts(store)
+    assert stored(store, QUARANTINE_DIR) == []
+    assert list(load_ingested(store)['Order ID']) == [150502]
+
+
+def test_copies_in_other_folders_have_their_own_part(data_dir, tmp_path):
+    store = tmp_path / 'store'
+    (data_dir / 'backup').mkdir()
+    shutil.copy(data_dir / 'Sales_January_2019.csv', data_dir / 'backup')
+    ingest(data_dir, store, workers=1)
+    assert len(set(parts(store))) == 3
+
+    (data_dir / 'backup' / 'Sales_January_2019.csv').unlink()
+    assert counts(ingest(data_dir, store, workers=1))['removed'] == 1
+    assert sorted(load_ingested(store)['Order ID']) == [141234, 141235, 150502]